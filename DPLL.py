@@ -1,13 +1,17 @@
-import time
-from typing import List
+import sys
+from typing import Callable, List, Union
 from cg import NodeType
-from formula import Formula
+from formula import Formula, Occurrences
 import os
 from pathlib import Path
-import sys
 from function import op_or
-
-sys.setrecursionlimit(3000)
+from heuristic import Heuristic, HEURISTICS
+from proof import Proof
+from search import Budget, Restart, RESTARTS
+from clausedb import ClauseDB
+import dimacs
+import cache
+from stats import Stats
 
 def compute_result_on_cnf(forms):
     ret = 1
@@ -20,70 +24,129 @@ def compute_result_on_cnf(forms):
 
 class CNFParser:
 
-    def __init__(self, cnf_folders: os.PathLike, encoding: str = "utf-8"):
+    def __init__(self, cnf_folders: os.PathLike, encoding: str = "utf-8", cache: bool = False):
         self.e = encoding
+        # 是否使用解析结果的二进制缓存
+        self.cache = cache
         if not os.path.exists(cnf_folders):
             raise FileExistsError(f"{Path(cnf_folders).absolute()} doesn't exist.")
         self.cnfs = []
         for cnf in os.listdir(cnf_folders):
-            if cnf.lower().endswith(".cnf"):
+            if cnf.lower().endswith(dimacs.SUFFIXES):
                 self.cnfs.append(os.path.join(cnf_folders, cnf))
 
-    def __parse_single_file(self, file: os.PathLike):
-        with open(file=file, mode="r", encoding=self.e) as cnf:
-            lines = cnf.readlines()
-
-        clauses = []
-        vars = []
-        for id in range(len(lines)):
-            if lines[id].startswith("c"):
-                continue
-            elif lines[id].startswith("p"):
-                infos = lines[id].split(" ")
-                vars = [Formula() for i in range(int(infos[2]))]
-                print(f"Current File : {file}\nBool Variable Number : {infos[2]}, Clause Number : {infos[3]}")
-            else:
-                clause = Formula(NodeType.BranchNode, op=op_or)
-                vars_in_int = map(lambda s: int(s), lines[id].split(" "))
-                for id, vi in enumerate(vars_in_int):
-                    if vi == 0: break
-                    if id == 0: 
-                        v = vars[vi-1] if vi > 0 else ~vars[-vi-1]
-                        clause.prev_nodes.append(v)
-                        v.next_nodes.append(clause)
-                    else: clause |= vars[vi-1] if vi > 0 else ~vars[-vi-1]
-                    clause |= vars[vi-1] if vi > 0 else ~vars[-vi-1]
-                clauses.append(clause)
-        return clauses, vars
+    def load(self, index: int) -> ClauseDB:
+        """只解析第index个文件，返回子句库而不构建 Formula 图"""
+        if self.cache:
+            db, header = cache.load(self.cnfs[index])
+        else:
+            db, header = dimacs.parse(self.cnfs[index])
+        nvars, nclauses = header if header is not None else (db.nvars, len(db))
+        print(f"Current File : {self.cnfs[index]}\nBool Variable Number : {nvars}, Clause Number : {nclauses}")
+        return db
 
     def __len__(self):
         return len(self.cnfs)
     
     def __getitem__(self, index):
-        return self.__parse_single_file(self.cnfs[index])
+        return self.load(index).toFormulas()
         
 class DPLL:
 
-    def __init__(self, form: List[Formula], vars: List[Formula]):
+    def __init__(self, form: List[Formula], vars: List[Formula], heuristic: Union[str, Heuristic] = "ordered",
+                 proof: Proof = None):
         self.forms = form
         self.vars = vars
-        self.branches = []
+        for i, var in enumerate(vars):
+            var.index = i
+            if var.invert is not None:
+                var.invert.index = i
+        # 文字 -> 子句的出现索引，供 rule2 以及 assign/fuzzy/update 使用
+        self.occ = Occurrences(form, vars)
+        for var in vars:
+            var.occ = self.occ
+            if var.invert is not None:
+                var.invert.occ = self.occ
+        if isinstance(heuristic, str):
+            heuristic = HEURISTICS[heuristic](len(vars))
+        self.heuristic = heuristic
+        self.heuristic.init(self.clauses())
+        # 指派轨迹，trail_lim[k] 为第 k+1 层决策在轨迹中的位置
+        self.trail = []
+        self.trail_lim = []
+        # 轨迹中下一个待传播的位置，trail 同时充当传播队列
+        self.qhead = 0
+        # 最近一次传播得到的冲突子句，回溯后清除
+        self.conflict = None
+        # 统计计数，由 stats.Stats.collect() 读取
+        self.conflicts = self.propagations = self.decisions = self.backtracks = self.max_depth = 0
+        # 每 progress_interval 次冲突以求解器为参数调用一次 progress
+        self.progress: Callable[["DPLL"], None] = None
+        self.progress_interval = 1000
+        # 内存预算(memory.Memory.attach() 设置)，每 memory_interval 次冲突检查一次
+        self.memory = None
+        self.memory_interval = 100
+        # DRAT 证明：DPLL 记录纯文字、每次冲突时否定当前全部决策的子句与空子句，CDCL 记录学习与删除的子句
+        self.proof = proof
+
+    def clauses(self):
+        """以 DIMACS 整数形式逐个返回子句"""
+        for form in self.forms:
+            yield [self.dimacs(lit) for lit in form.prev_nodes]
+
+    def dimacs(self, lit: Formula):
+        """原子公式 -> DIMACS 整数"""
+        return lit.index + 1 if lit is self.vars[lit.index] else -lit.index - 1
+
+    def atom(self, dimacs: int):
+        """DIMACS 整数 -> 原子公式，必要时创建新的变元"""
+        while abs(dimacs) > len(self.vars):
+            var = Formula()
+            var.index = len(self.vars)
+            var.occ = self.occ
+            self.vars.append(var)
+            self.heuristic.grow(len(self.vars))
+        var = self.vars[abs(dimacs) - 1]
+        return var if dimacs > 0 else ~var
+
+    def isAssignedVar(self, index: int):
+        return self.vars[index].assigned
+
+    def watch(self):
+        """为未满足的子句建立两个监视文字，单元子句直接入队，遇到空子句或矛盾的单元子句返回False"""
+        for form in self.forms:
+            if form.value:
+                continue
+            lits = form.prev_nodes
+            if len(lits) > 1:
+                lits[0].watches.append(form)
+                lits[1].watches.append(form)
+            elif not lits or lits[0].value is False:
+                return False
+            elif not lits[0].isAssigned():
+                lits[0].set(1)
+                self.trail.append(lits[0])
+        return True
 
     def rule1(self):
-        """单子句规则"""
-        used = False
-        single_atoms = []
-        single_forms = []
-        for f in self.forms:
-            # len 被重载为返回当前仍未赋值的变元数，如果其已经SAT则返回0
-            if len(f) == 1:
-                used = True
-                single_atoms.append(f[0])
-                for formula in Formula.getFormulas(f[0]):
-                    if not formula.isSatisfied():
-                        single_forms.append(formula)
-                f[0].assign(1)
-        return used, single_atoms, single_forms
+        """单子句规则：依次传播轨迹上的新指派，只访问监视被置假文字的子句，返回冲突子句"""
+        trail = self.trail
+        while self.qhead < len(trail):
+            lit = trail[self.qhead]
+            self.qhead += 1
+            self.propagations += 1
+            # 轨迹上的文字可能被置为真或假，需要检查的是其中为假的一方
+            if lit.value:
+                lit = lit.invert
+                if lit is None:
+                    continue
+            # 推出的单元文字直接追加到轨迹末尾
+            conflict = lit.propagate(trail, len(self.trail_lim))
+            if conflict is not None:
+                self.qhead = len(trail)
+                self.conflict = conflict
+                return conflict
+        return None
     
     def rule2(self):
         """纯文字规则"""
@@ -95,11 +158,17 @@ class DPLL:
             if var.invert is None:
                 used = True
                 var.assign(1)
+                self.trail.append(var)
+                if self.proof is not None:
+                    self.proof.add([self.dimacs(var)])
                 [formula.sat() for formula in forms]
             # 包含~A，且当前A不在任何公式当中，即仅出现~A 
             elif not forms:
                 used = True
                 (~var).assign(1)
+                self.trail.append(~var)
+                if self.proof is not None:
+                    self.proof.add([self.dimacs(~var)])
                 [formula.sat() for formula in Formula.getFormulas(~var)]
         return used
 
@@ -114,96 +183,446 @@ class DPLL:
         return used
 
     def rule4(self):
-        """分裂规则"""
-        for var in self.vars:
-            if not var.isAssigned():
-                var.assign(0)
-                # 用于回溯
-                self.branches.append(var)
-                return True
-        return False
+        """分裂规则：由分支启发式选择变元及其取值"""
+        index = self.heuristic.pick(self.isAssignedVar)
+        if index < 0:
+            return False
+        var = self.vars[index]
+        # 用于回溯
+        self.newLevel()
+        var.set(self.heuristic.phase[index], None, len(self.trail_lim))
+        self.trail.append(var)
+        return True
         
+    def newLevel(self):
+        self.trail_lim.append(len(self.trail))
+        self.decisions += 1
+        if len(self.trail_lim) > self.max_depth:
+            self.max_depth = len(self.trail_lim)
+
     def isSAT(self):
-        for f in self.forms:
-            if not f.isSatisfied():
-                return False
-        return True
-    
+        """
+        O(1)：全部变元已指派、传播完毕且没有冲突。
+        完整的单元传播保证此时没有子句为假，因此每个子句都有为真的文字，不需要重新计算公式。
+        """
+        return self.conflict is None and self.qhead == len(self.trail) and self.isAssigned()
+
     def isAssigned(self):
-        for var in self.vars:
-            if not var.isAssigned():
-                return False
-        return True
+        """O(1)：每个变元至多在轨迹上出现一次"""
+        return len(self.trail) == len(self.vars)
     
-    def solve(self):
+    def backtrack(self, level: int):
+        """回溯到第level层：一次截断撤销该层之后的全部指派"""
+        if level >= len(self.trail_lim):
+            return
+        self.backtracks += 1
+        trail, vars, heuristic = self.trail, self.vars, self.heuristic
+        start = self.trail_lim[level]
+        for i in range(start, len(trail)):
+            index = trail[i].index
+            heuristic.unassign(index, vars[index].value)
+            trail[i].unset()
+        del trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = start
+        self.conflict = None
+
+    def solve(self, conflicts: int = None, propagations: int = None, timeout: float = None,
+              interrupt: Callable[[], bool] = None):
+        """超出冲突次数、传播次数、秒数限制或 interrupt() 返回真时返回 None(UNKNOWN)"""
+        budget = Budget(self, conflicts, propagations, timeout, interrupt)
         self.rule2()
         self.rule3()
-        rule1_state = []
-        while not self.isSAT():
-            
-            if self.isAssigned():
-                # stack traceback
-                while self.branches:
-                    branch = self.branches[-1]
-                    if branch.value == 1:
-                        # 还原rule1状态
-                        state = rule1_state[-1]
-                        branch.fuzzy()
-                        for single_atom in state[0]:
-                            single_atom.fuzzy()
-                        for single_form in state[1]:
-                            single_form.fuzzy()
-                        rule1_state.pop()
-                        self.branches.pop()
-                    else: 
-                        branch.assign(1)
-                        state = rule1_state[-1]
-                        for single_atom in state[0]:
-                            single_atom.fuzzy()
-                        for single_form in state[1]:
-                            single_form.fuzzy()
-                        rule1_state.pop()
-                        # 添加回溯0的状态
-                        temp_atoms = []
-                        temp_forms = []
-                        while True: 
-                            ret, temp_A, temp_F = self.rule1()
-                            if not ret: break
-                            temp_atoms += temp_A
-                            temp_forms += temp_F
-                        rule1_state.append((temp_atoms, temp_forms))
-                        break
-                if not self.branches:
-                    return False
-            # normal rule
+        if not self.watch() or self.rule1() is not None:
+            return self.refute()
+        while self.rule4():
+            while self.rule1() is not None:
+                if not self.trail_lim:
+                    return self.refute()
+                self.conflicts += 1
+                if budget.exceeded(self):
+                    return None
+                if self.progress is not None and self.conflicts % self.progress_interval == 0:
+                    self.progress(self)
+                if self.memory is not None and self.conflicts % self.memory_interval == 0:
+                    self.memory.check(self)
+                if self.proof is not None:
+                    # 轨迹上的原子可能被置为真或假，子句由各决策为假的文字组成
+                    decisions = [self.trail[i] for i in self.trail_lim]
+                    self.proof.add([self.dimacs(lit) * (-1 if lit.value else 1) for lit in decisions])
+                self.flip()
+            if budget.poll(self):
+                return None
+        return True
+
+    def flip(self):
+        """stack traceback: 撤销最近的决策，其相反值作为上一层推出的文字"""
+        decision = self.trail[self.trail_lim[-1]]
+        value = decision.value
+        self.backtrack(len(self.trail_lim) - 1)
+        decision.set(not value, None, len(self.trail_lim))
+        self.trail.append(decision)
+
+    def models(self, conflicts: int = None, propagations: int = None, timeout: float = None,
+               interrupt: Callable[[], bool] = None):
+        """
+        时间顺序回溯枚举全部模型：找到模型后像冲突一样翻转最近的决策继续搜索，各个模型互不相同，不需要阻塞子句。
+        纯文字规则会丢失模型，因此不使用 rule2。逐个产生 DIMACS 模型，超出限制时产生 None 后结束。
+        """
+        budget = Budget(self, conflicts, propagations, timeout, interrupt)
+        self.rule3()
+        if not self.watch():
+            return
+        while True:
+            while self.rule1() is not None:
+                if not self.trail_lim:
+                    return
+                self.conflicts += 1
+                if budget.exceeded(self):
+                    yield None
+                    return
+                self.flip()
+            if budget.poll(self):
+                yield None
+                return
             if self.rule4():
-                temp_atoms = []
-                temp_forms = []
-                while True: 
-                    ret, temp_A, temp_F = self.rule1()
-                    if not ret: break
-                    temp_atoms += temp_A
-                    temp_forms += temp_F
-                rule1_state.append((temp_atoms, temp_forms))
+                continue
+            yield self.model()
+            if not self.trail_lim:
+                return
+            if budget.exceeded(self):
+                yield None
+                return
+            self.flip()
+
+    def model(self):
+        """以 DIMACS 整数列表返回当前指派，未指派的变元取正"""
+        return [-i - 1 if var.value is False else i + 1 for i, var in enumerate(self.vars)]
+
+    def refute(self):
+        """公式不可满足：在证明中记录空子句，返回 False"""
+        if self.proof is not None:
+            self.proof.add(())
+        return False
+
+
+class CDCL(DPLL):
+
+    def __init__(self, form: List[Formula], vars: List[Formula], heuristic: Union[str, Heuristic] = "vsids",
+                 max_learnts: float = None, clause_decay: float = 0.999, restart: Union[str, Restart] = "luby",
+                 proof: Proof = None):
+        super().__init__(form, vars, heuristic, proof)
+        if isinstance(restart, str):
+            restart = RESTARTS[restart]()
+        self.restart = restart
+        self.restarts = self.learned = 0
+        # 学习子句及其活跃度
+        self.learnts: List[Formula] = []
+        self.activity = {}
+        self.cla_inc = 1.0
+        self.clause_decay = clause_decay
+        self.max_learnts = max_learnts if max_learnts is not None else max(len(form) / 3, 100)
+        # 冲突分析时用 visited 标记文字，每次分析使用一个新的负数
+        self.stamp = 0
+        # 是否已经建立监视，之后加入的子句需要单独处理
+        self.started = False
+        self.ok = True
+        # 上一次以假设求解得到 UNSAT 时，导致冲突的假设(DIMACS)
+        self.core: List[int] = []
+
+    def analyze(self, conflict: Formula):
+        """1-UIP 冲突分析，返回学习子句的文字(UIP 的否定在首位)与回跳层"""
+        self.stamp -= 1
+        stamp = self.stamp
+        trail = self.trail
+        level = len(self.trail_lim)
+        learnt = [None]
+        counter = 0
+        index = len(trail)
+        form = conflict
+        lit = None
+        while True:
+            if form in self.activity:
+                self.bump(form)
+            for q in form.prev_nodes:
+                if q is lit or q.visited == stamp or q.level == 0:
+                    continue
+                q.visited = stamp
+                if q.invert is not None:
+                    q.invert.visited = stamp
+                self.heuristic.bump(q.index)
+                if q.level == level:
+                    counter += 1
+                else:
+                    learnt.append(q)
+            # 沿轨迹找到最近被标记的文字
+            index -= 1
+            while trail[index].visited != stamp:
+                index -= 1
+            lit = trail[index]
+            counter -= 1
+            if not counter:
+                break
+            form = lit.reason
+        # 决策在轨迹上记录的是被置假的变元本身
+        learnt[0] = lit if lit.value is False else ~lit
+        # 回跳到学习子句中除 UIP 外的最高层，并把该文字放在第二个监视位置
+        back_level = 0
+        for i in range(1, len(learnt)):
+            if learnt[i].level > back_level:
+                back_level = learnt[i].level
+                learnt[1], learnt[i] = learnt[i], learnt[1]
+        return learnt, back_level
+
+    def analyzeFinal(self, p: Formula):
+        """假设 p 已被置假，沿轨迹找出推出 ~p 的假设，返回这些假设与 p(DIMACS)"""
+        core = [self.dimacs(p)]
+        if p.level == 0:
+            return core
+        self.stamp -= 1
+        stamp = self.stamp
+        p.visited = p.invert.visited = stamp
+        trail = self.trail
+        for i in range(len(trail) - 1, self.trail_lim[0] - 1, -1):
+            lit = trail[i]
+            if lit.visited != stamp:
+                continue
+            if lit.reason is None:
+                core.append(self.dimacs(lit))
+            else:
+                for q in lit.reason.prev_nodes:
+                    if q.level > 0:
+                        q.visited = stamp
+                        if q.invert is not None:
+                            q.invert.visited = stamp
+        return core
+
+    def add_clause(self, clause: List[int]):
+        """在两次 solve() 之间以 DIMACS 整数加入子句，图与学习子句保留，返回公式是否仍可能满足"""
+        lits = list(dict.fromkeys(self.atom(d) for d in clause))
+        form = Formula(NodeType.BranchNode, op_or)
+        form.prev_nodes = lits
+        form.length = len(lits)
+        for lit in lits:
+            lit.next_nodes.append(form)
+        self.forms.append(form)
+        self.occ.add(form)
+        if not self.started or not self.ok:
+            return self.ok
+        self.backtrack(0)
+        # 未被置假的文字放在前面作为监视文字
+        lits.sort(key=lambda lit: lit.value is False)
+        if not lits or lits[0].value is False:
+            self.ok = False
+        elif len(lits) == 1 or lits[1].value is False:
+            if not lits[0].isAssigned():
+                lits[0].set(1)
+                self.trail.append(lits[0])
+                self.ok = self.rule1() is None
+        if len(lits) > 1:
+            lits[0].watches.append(form)
+            lits[1].watches.append(form)
+        return self.ok
+
+    def learn(self, lits: List[Formula]):
+        """将学习子句作为新的 Formula 分支节点加入图中，并由其推出 UIP 文字"""
+        self.learned += 1
+        if self.proof is not None:
+            self.proof.add([self.dimacs(lit) for lit in lits])
+        if len(lits) == 1:
+            lits[0].set(1)
+            self.trail.append(lits[0])
+            return
+        form = Formula(NodeType.BranchNode, op_or)
+        form.prev_nodes = lits
+        form.length = len(lits)
+        for lit in lits:
+            lit.next_nodes.append(form)
+        lits[0].watches.append(form)
+        lits[1].watches.append(form)
+        self.learnts.append(form)
+        self.activity[form] = 0.0
+        self.bump(form)
+        lits[0].set(1, form, len(self.trail_lim))
+        self.trail.append(lits[0])
+
+    def bump(self, form: Formula):
+        """提高学习子句的活跃度"""
+        self.activity[form] += self.cla_inc
+        if self.activity[form] > 1e20:
+            for f in self.activity:
+                self.activity[f] *= 1e-20
+            self.cla_inc *= 1e-20
+
+    def remove(self, form: Formula):
+        """从图与监视列表中删除一个学习子句"""
+        lits = form.prev_nodes
+        lits[0].watches.remove(form)
+        lits[1].watches.remove(form)
+        for lit in lits:
+            lit.next_nodes.remove(form)
+        del self.activity[form]
+        if self.proof is not None:
+            self.proof.delete([self.dimacs(lit) for lit in lits])
+
+    def reduceDB(self):
+        """删除活跃度较低的一半学习子句，二元子句与正作为推理原因的子句保留"""
+        self.learnts.sort(key=self.activity.__getitem__)
+        half = len(self.learnts) // 2
+        kept = []
+        for i, form in enumerate(self.learnts):
+            lits = form.prev_nodes
+            if i < half and len(lits) > 2 and not (lits[0].reason is form and lits[0].value):
+                self.remove(form)
+            else:
+                kept.append(form)
+        self.learnts = kept
+        self.max_learnts *= 1.1
+
+    def solve(self, assumptions: List[int] = (), conflicts: int = None, propagations: int = None,
+              timeout: float = None, interrupt: Callable[[], bool] = None):
+        """
+        可以多次调用，assumptions 为本次求解假设为真的 DIMACS 文字，因假设得到 UNSAT 时 core 为其中导致冲突的部分。
+        纯文字规则在加入新子句或使用假设后不再成立，因此这里不使用 rule2。搜索限制与 DPLL.solve 相同。
+        """
+        budget = Budget(self, conflicts, propagations, timeout, interrupt)
+        self.core = []
+        if not self.started:
+            self.started = True
+            self.rule3()
+            self.ok = self.watch()
+        self.backtrack(0)
+        assumptions = [self.atom(d) for d in assumptions]
+        if not self.ok or self.rule1() is not None:
+            self.ok = False
+            return self.refute()
+        return self.search(assumptions, budget)
+
+    def search(self, assumptions: List[Formula], budget: Budget):
+        """从当前轨迹继续搜索，assumptions 为原子公式，返回值与 solve() 相同"""
+        while True:
+            conflict = self.rule1()
+            if conflict is not None:
+                if not self.trail_lim:
+                    self.ok = False
+                    return self.refute()
+                self.conflicts += 1
+                learnt, level = self.analyze(conflict)
+                restart = self.restart.conflict(len({lit.level for lit in learnt}), len(self.trail))
+                self.backtrack(level)
+                self.learn(learnt)
+                self.cla_inc /= self.clause_decay
+                self.heuristic.decay()
+                if len(self.learnts) >= self.max_learnts:
+                    self.reduceDB()
+                if self.memory is not None and self.conflicts % self.memory_interval == 0:
+                    self.memory.check(self)
+                if budget.exceeded(self):
+                    self.backtrack(0)
+                    return None
+                if restart:
+                    self.restarts += 1
+                    self.restart.restart()
+                    self.backtrack(0)
+                if self.progress is not None and self.conflicts % self.progress_interval == 0:
+                    self.progress(self)
+            elif budget.poll(self):
+                self.backtrack(0)
+                return None
+            elif len(self.trail_lim) < len(assumptions):
+                # 依次把假设作为决策，已经为真的假设只占一个空的决策层
+                p = assumptions[len(self.trail_lim)]
+                if p.value is False:
+                    self.core = self.analyzeFinal(p)
+                    return False
+                self.newLevel()
+                if p.value is None:
+                    p.set(1, None, len(self.trail_lim))
+                    self.trail.append(p)
+            elif not self.rule4():
+                return True
+
+    def models(self, assumptions: List[int] = (), projection: List[int] = None, conflicts: int = None,
+               propagations: int = None, timeout: float = None, interrupt: Callable[[], bool] = None):
+        """与 Solver.models() 相同：每个模型之后加入阻塞子句并回跳，逐个产生 DIMACS 模型，超出限制时产生 None 后结束"""
+        budget = Budget(self, conflicts, propagations, timeout, interrupt)
+        self.core = []
+        if not self.started:
+            self.started = True
+            self.rule3()
+            self.ok = self.watch()
+        self.backtrack(0)
+        assumptions = [self.atom(d) for d in assumptions]
+        if not self.ok or self.rule1() is not None:
+            self.ok = False
+            self.refute()
+            return
+        while True:
+            ret = self.search(assumptions, budget)
+            if ret is None:
+                yield None
+            if not ret:
+                return
+            model = self.model()
+            if projection is None:
+                decisions = [self.trail[i] for i in self.trail_lim[len(assumptions):]]
+                lits = [~p for p in assumptions] + [~lit if lit.value else lit for lit in decisions]
+            else:
+                lits = [self.atom(-model[v - 1]) for v in projection]
+            ok = self.block(lits)
+            yield model
+            if not ok:
+                return
+            if budget.exceeded(self):
+                yield None
+                return
+
+    def block(self, lits: List[Formula]):
+        """加入在当前指派下全部为假的子句并回跳，与 Solver.block() 相同"""
+        lits = sorted(dict.fromkeys(lits), key=lambda lit: -lit.level)
+        if not lits or lits[0].level == 0:
+            self.ok = False
+            return False
+        form = Formula(NodeType.BranchNode, op_or)
+        form.prev_nodes = lits
+        form.length = len(lits)
+        for lit in lits:
+            lit.next_nodes.append(form)
+        self.forms.append(form)
+        self.occ.add(form)
+        if len(lits) == 1:
+            self.backtrack(0)
+            lits[0].set(1)
+            self.trail.append(lits[0])
+            return True
+        lits[0].watches.append(form)
+        lits[1].watches.append(form)
+        if lits[0].level > lits[1].level:
+            self.backtrack(lits[1].level)
+            lits[0].set(1, form, len(self.trail_lim))
+            self.trail.append(lits[0])
+        else:
+            self.backtrack(lits[0].level - 1)
         return True
 
   
 if __name__ == "__main__":
-    cnfs = CNFParser("./randn_cnfs")
+    cnfs = CNFParser("./randn_cnfs", cache=True)
     preprocess = []
     solves = []
     for i in range(len(cnfs)):
-        s = time.time()
         print('-'*25)
-        forms, vars = cnfs[i]
-        print(f"Preprocess Time : {1e3*(time.time()-s):.4f} ms")
-        solver = DPLL(forms, vars)
-        s = time.time()
-        
-        print("SAT result :",solver.solve())
-        print(f"solved in {1e3*(time.time()-s):.4f}ms")
+        stats = Stats(profile="--profile" in sys.argv)
+        with stats.timer("parse"):
+            db = cnfs.load(i)
+        with stats.timer("build"):
+            forms, vars = db.toFormulas()
+        solver = stats.instrument(DPLL(forms, vars))
+        with stats.timer("solve"):
+            print("SAT result :",solver.solve())
         ret = compute_result_on_cnf(forms)
         print("compute result :", ret)
+        print(stats.collect(solver))
         # if ret:
         #     print("vars assign : ")
         #     for var in vars: 
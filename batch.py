@@ -0,0 +1,252 @@
+import json
+import multiprocessing as mp
+import os
+import resource
+import signal
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, List
+from DPLL import CNFParser, DPLL, CDCL
+from solver import Solver
+from search import RESTARTS
+from evaluate import Evaluator
+from localsearch import LocalSearch
+from memory import Memory
+from proof import Proof
+from stats import Stats
+import cache
+import dimacs
+import preprocess
+
+SOLVERS = ["solver", "cdcl", "dpll", "localsearch"]
+
+# 工作进程中的共享数组，started[i] 表示第 i 个实例已经开始求解，由进程池的 initializer 设置
+_started = None
+
+
+def _limit_memory(memory: int):
+    """进程池初始化：限制每个工作进程的地址空间(字节)"""
+    if memory:
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+
+
+def _init(memory: int, started):
+    global _started
+    _started = started
+    _limit_memory(memory)
+
+
+def _run(i: int, file: os.PathLike, **kwargs) -> Dict:
+    _started[i] = 1
+    return solve_file(file, **kwargs)
+
+
+def _timeout(signum, frame):
+    raise TimeoutError()
+
+
+def solve_file(file: os.PathLike, solver: str = "solver", heuristic: str = None, use_cache: bool = True,
+               timeout: float = None, model: bool = True, simplify: bool = False, restart: str = None,
+               conflicts: int = None, verify: bool = False, warm: int = 0, profile: bool = False,
+               proof: os.PathLike = None, binary: bool = False, budget: int = None) -> Dict:
+    """
+    求解单个文件，返回可序列化为 JSON 的结果，超时、超出冲突次数或内存不足时 result 为 UNKNOWN。
+    求解器在冲突之间检查剩余时间并主动停止，SIGALRM 只用于打断解析、化简等无法主动停止的步骤。
+    verify 时用原公式检查模型，结果记录在 verified 中。
+    warm 为先运行局部搜索的翻转次数，找到模型时直接返回，否则把最好的指派作为完备求解器的初始相位。
+    求解器的计数记录在 stats 中，profile 时还包括各方法的调用次数与耗时。
+    proof 为目录时把化简与求解过程的 DRAT 证明写到其中的 <文件名>.drat，binary 时为二进制格式。
+    budget 为求解器的内存预算(字节)，超过时释放缓存并缩减学习子句，估计值与峰值记录在 stats 的 memory 中。
+    """
+    record = {"file": str(file), "solver": solver, "result": "UNKNOWN"}
+    # 在解析之前创建，rss_growth 包括解析与建图
+    stats = Stats(profile)
+    deadline = time.time() + timeout if timeout else None
+    if proof is not None:
+        os.makedirs(proof, exist_ok=True)
+        proof = Proof(os.path.join(proof, os.path.basename(file) + ".drat"), binary)
+    if timeout:
+        signal.signal(signal.SIGALRM, _timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        s = time.time()
+        db = cache.load(file)[0] if use_cache else dimacs.parse(file)[0]
+        record["parse_time"] = time.time() - s
+        # 求解器会向子句库追加学习子句，先复制原公式
+        evaluator = Evaluator(db) if verify else None
+        pre = None
+        if simplify:
+            s = time.time()
+            db, pre = preprocess.simplify(db, proof=proof)
+            record["preprocess_time"] = time.time() - s
+            if db is None:
+                record["result"] = "UNSAT"
+                if proof is not None:
+                    record["proof"] = proof.file.name
+                return record
+        kwargs = {"heuristic": heuristic} if heuristic else {}
+        if proof is not None and solver != "localsearch":
+            kwargs["proof"] = proof
+        if restart and solver not in ("dpll", "localsearch"):
+            kwargs["restart"] = restart
+        s = time.time()
+        search = ret = None
+        left = None if deadline is None else max(deadline - time.time() - 0.05, 0)
+        if solver == "localsearch" or warm:
+            search = LocalSearch(db, seed=0)
+            ret = search.solve(max_flips=warm or None, timeout=left)
+        if solver == "localsearch" or ret is not None:
+            # 局部搜索已经得到结果(找到模型或遇到空子句)
+            engine, solver = search, "localsearch"
+        elif solver == "solver":
+            engine = Solver(db, **kwargs)
+        else:
+            forms, vars = db.toFormulas()
+            record["build_time"] = time.time() - s
+            s = time.time()
+            engine = (CDCL if solver == "cdcl" else DPLL)(forms, vars, **kwargs)
+        if engine is not search:
+            stats.instrument(engine)
+            if budget:
+                Memory(budget).attach(engine)
+            if search is not None:
+                search.phases(engine.heuristic)
+            # 留出一点时间让求解器先于 SIGALRM 主动停止
+            left = None if deadline is None else max(deadline - time.time() - 0.05, 0)
+            ret = engine.solve(conflicts=conflicts, timeout=left)
+        record["solve_time"] = time.time() - s
+        record["stats"] = stats.collect(engine).toDict()
+        if ret is None:
+            record["error"] = "limit"
+            return record
+        record["result"] = "SAT" if ret else "UNSAT"
+        if not ret and proof is not None:
+            if engine is search:
+                # 局部搜索只在存在空子句时返回 False
+                proof.add(())
+            record["proof"] = proof.file.name
+        if ret and (model or verify):
+            if solver in ("solver", "localsearch"):
+                found = engine.model()
+            else:
+                found = [i + 1 if var.value else -i - 1 for i, var in enumerate(vars)]
+            if pre is not None:
+                found = pre.extend(found)
+            if verify:
+                record["verified"] = evaluator.check(found)
+            if model:
+                record["model"] = found
+    except TimeoutError:
+        record["error"] = "timeout"
+    except MemoryError:
+        record["error"] = "memout"
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        if proof is not None:
+            proof.close()
+            # 只保留 UNSAT 的证明
+            if record["result"] != "UNSAT":
+                os.remove(proof.file.name)
+    return record
+
+
+def run(files: Iterable[os.PathLike], workers: int = None, timeout: float = None, memory: int = None,
+        **kwargs) -> Iterable[Dict]:
+    """
+    用进程池求解一批文件，按完成顺序逐个返回结果；kwargs 传给 solve_file。
+    工作进程崩溃(被系统终止、原生代码出错等)会使整个进程池失效：尚未开始的实例提交到新的进程池，
+    已经开始的实例各自在单独的进程中重新求解，再次崩溃的才记为 UNKNOWN(error 为 crashed)。
+    """
+    files = list(files)
+    ctx = mp.get_context()
+    started = ctx.RawArray("b", len(files))
+    pools = []
+
+    def pool(n: int) -> ProcessPoolExecutor:
+        executor = ProcessPoolExecutor(n, mp_context=ctx, initializer=_init, initargs=(memory, started))
+        pools.append(executor)
+        return executor
+
+    main = pool(workers)
+    # future -> (实例下标, 所在的进程池, 是否单独运行)
+    futures = {main.submit(_run, i, file, timeout=timeout, **kwargs): (i, main, False)
+               for i, file in enumerate(files)}
+    try:
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                i, executor, alone = futures.pop(future)
+                try:
+                    yield future.result()
+                except BrokenProcessPool as e:
+                    if alone:
+                        # 单独运行时崩溃，就是这个实例
+                        yield {"file": str(files[i]), "result": "UNKNOWN", "error": f"crashed: {e!r}"}
+                    elif started[i]:
+                        # 崩溃时正在求解的实例之一
+                        single = pool(1)
+                        futures[single.submit(_run, i, files[i], timeout=timeout, **kwargs)] = (i, single, True)
+                    else:
+                        if executor is main:
+                            pools.remove(main)
+                            main.shutdown(wait=False)
+                            main = pool(workers)
+                        futures[main.submit(_run, i, files[i], timeout=timeout, **kwargs)] = (i, main, False)
+                except Exception as e:
+                    yield {"file": str(files[i]), "result": "UNKNOWN", "error": repr(e)}
+                if alone:
+                    pools.remove(executor)
+                    executor.shutdown(wait=False)
+    finally:
+        for executor in pools:
+            executor.shutdown(cancel_futures=True)
+
+
+def files(paths: List[os.PathLike]):
+    """展开目录中的 CNF 文件"""
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(CNFParser(path).cnfs)
+        else:
+            yield path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="solve CNF files in parallel and stream JSONL results")
+    parser.add_argument("paths", nargs="+", help="CNF files or folders")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=None, help="seconds per instance")
+    parser.add_argument("--memory", type=int, default=None, help="MB per worker")
+    parser.add_argument("--budget", type=int, default=None,
+                        help="solver memory budget in MB, caches and learned clauses are shed above it")
+    parser.add_argument("--solver", choices=SOLVERS, default="solver")
+    parser.add_argument("--heuristic", default=None)
+    parser.add_argument("--restart", choices=list(RESTARTS), default=None)
+    parser.add_argument("--conflicts", type=int, default=None, help="conflict limit per instance")
+    parser.add_argument("--preprocess", action="store_true", help="simplify before solving")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--no-model", action="store_true")
+    parser.add_argument("--verify", action="store_true", help="check models against the original formula")
+    parser.add_argument("--warm", type=int, default=0, help="local search flips before complete search")
+    parser.add_argument("--profile", action="store_true", help="time the solver methods")
+    parser.add_argument("--proof", default=None, help="folder for DRAT proofs of the instances")
+    parser.add_argument("--binary-proof", action="store_true", help="write binary DRAT")
+    parser.add_argument("-o", "--output", default=None, help="JSONL file, stdout by default")
+    args = parser.parse_args()
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    memory = args.memory * (1 << 20) if args.memory else None
+    for record in run(files(args.paths), args.workers, args.timeout, memory, solver=args.solver,
+                      heuristic=args.heuristic, use_cache=not args.no_cache, model=not args.no_model,
+                      simplify=args.preprocess, restart=args.restart, conflicts=args.conflicts, verify=args.verify,
+                      warm=args.warm, profile=args.profile, proof=args.proof, binary=args.binary_proof,
+                      budget=args.budget * (1 << 20) if args.budget else None):
+        out.write(json.dumps(record) + "\n")
+        out.flush()
+    if out is not sys.stdout:
+        out.close()
@@ -0,0 +1,160 @@
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List
+from clausedb import ClauseDB
+import batch
+import dimacs
+
+# 默认比较的求解器配置，格式为 solver[:heuristic[:restart]]
+CONFIGS = ["solver", "cdcl", "dpll"]
+
+
+def random_ksat(n: int, m: int, k: int = 3, rng: random.Random = None) -> ClauseDB:
+    """n 个变元、m 个子句的随机 k-SAT，每个子句的 k 个变元互不相同"""
+    rng = rng or random.Random()
+    db = ClauseDB(n)
+    for _ in range(m):
+        db.add([v if rng.random() < 0.5 else -v for v in rng.sample(range(1, n + 1), min(k, n))])
+    return db
+
+
+def generate(folder: os.PathLike, sizes: Iterable[int], ratios: Iterable[float], k: int = 3, count: int = 1,
+             seed: int = 0) -> List[str]:
+    """在 folder 中生成随机 k-SAT 实例，同样的参数总是得到同样的文件，已存在的文件不会重写"""
+    os.makedirs(folder, exist_ok=True)
+    files = []
+    for n in sizes:
+        for ratio in ratios:
+            for i in range(count):
+                file = os.path.join(folder, f"rand-k{k}-n{n}-r{ratio}-s{seed}-{i}.cnf")
+                if not os.path.exists(file):
+                    # 以字符串为种子，结果与 PYTHONHASHSEED 无关
+                    rng = random.Random(f"{seed}-{k}-{n}-{ratio}-{i}")
+                    db = random_ksat(n, round(n * ratio), k, rng)
+                    dimacs.write(file, db, (f"random {k}-SAT n={n} ratio={ratio} seed={seed} index={i}",))
+                files.append(file)
+    return files
+
+
+def parse_config(config: str) -> Dict:
+    solver, heuristic, restart = (config.split(":") + [None, None])[:3]
+    return {"solver": solver, "heuristic": heuristic or None, "restart": restart or None}
+
+
+def _run(file: str, config: str, rep: int, timeout: float) -> Dict:
+    """在独立的进程中运行一次，峰值内存为该进程的最大常驻内存"""
+    record = batch.solve_file(file, use_cache=False, model=False, timeout=timeout, **parse_config(config))
+    record.update(config=config, rep=rep, peak_mb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+    return record
+
+
+def run(files: List[str], configs: List[str], reps: int = 3, timeout: float = None, workers: int = 1):
+    """每个 (文件, 配置) 运行 reps 次，每次使用一个新的进程，按提交顺序返回结果"""
+    tasks = [(file, config, rep) for file in files for config in configs for rep in range(reps)]
+    with ProcessPoolExecutor(workers, max_tasks_per_child=1) as pool:
+        futures = [pool.submit(_run, file, config, rep, timeout) for file, config, rep in tasks]
+        for (file, config, rep), future in zip(tasks, futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                yield {"file": file, "config": config, "rep": rep, "result": "UNKNOWN", "error": repr(e)}
+
+
+def summarize(records: Iterable[Dict]) -> Dict[str, Dict]:
+    """按 文件|配置 汇总：结果、解析与求解时间的中位数、最大峰值内存、计数(取第一次)"""
+    groups: Dict[str, List[Dict]] = {}
+    for record in records:
+        groups.setdefault(f"{os.path.basename(record['file'])}|{record['config']}", []).append(record)
+    summary = {}
+    for key, group in groups.items():
+        results = {r["result"] for r in group}
+        summary[key] = {
+            "result": results.pop() if len(results) == 1 else "MIXED",
+            "runs": len(group),
+            "parse_time": statistics.median(r.get("parse_time", 0.0) for r in group),
+            "solve_time": statistics.median(r.get("solve_time", 0.0) for r in group),
+            "peak_mb": max(r.get("peak_mb", 0.0) for r in group),
+            "counters": group[0].get("stats", {}).get("counters", {}),
+        }
+    return summary
+
+
+def compare(summary: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float = 1.2,
+            min_time: float = 0.01) -> List[str]:
+    """
+    与基线比较，返回回归说明：结果不同，或求解时间、峰值内存超过基线的 threshold 倍
+    (求解时间的差小于 min_time 秒时忽略，避免极短的运行因计时噪声被误报)。
+    """
+    regressions = []
+    for key, current in summary.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if current["result"] != base["result"] and "UNKNOWN" not in (current["result"], base["result"]):
+            regressions.append(f"{key}: result {base['result']} -> {current['result']}")
+        t, bt = current["solve_time"], base["solve_time"]
+        if t > bt * threshold and t - bt >= min_time:
+            regressions.append(f"{key}: solve time {1e3*bt:.2f}ms -> {1e3*t:.2f}ms ({t/max(bt, 1e-9):.2f}x)")
+        if base["peak_mb"] and current["peak_mb"] > base["peak_mb"] * threshold:
+            regressions.append(f"{key}: peak memory {base['peak_mb']:.1f}MB -> {current['peak_mb']:.1f}MB")
+    return regressions
+
+
+def load(file: os.PathLike) -> Dict[str, Dict]:
+    with open(file) as f:
+        return json.load(f)["summary"]
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="benchmark solver configurations and compare with a baseline")
+    parser.add_argument("paths", nargs="*", help="CNF files or folders")
+    parser.add_argument("--sizes", type=lambda s: [int(x) for x in s.split(",")], default=[],
+                        help="generate random k-SAT with these numbers of variables, e.g. 50,100")
+    parser.add_argument("--ratios", type=lambda s: [float(x) for x in s.split(",")], default=[4.26])
+    parser.add_argument("-k", type=int, default=3)
+    parser.add_argument("--count", type=int, default=3, help="instances per size and ratio")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--folder", default="./randn_cnfs", help="where generated instances are written")
+    parser.add_argument("--configs", type=lambda s: s.split(","), default=CONFIGS,
+                        help="comma separated solver[:heuristic[:restart]]")
+    parser.add_argument("--reps", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("-j", "--workers", type=int, default=1)
+    parser.add_argument("-o", "--output", default="bench.json")
+    parser.add_argument("--baseline", default=None, help="results file to compare with")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    args = parser.parse_args()
+
+    files = list(batch.files(args.paths))
+    if args.sizes:
+        files += generate(args.folder, args.sizes, args.ratios, args.k, args.count, args.seed)
+    if not files:
+        parser.error("no instances, give CNF paths or --sizes")
+    s = time.time()
+    records = []
+    for record in run(files, args.configs, args.reps, args.timeout, args.workers):
+        records.append(record)
+        print(f"{os.path.basename(record['file']):32s} {record['config']:20s} #{record['rep']} "
+              f"{record['result']:8s} {1e3*record.get('solve_time', 0):10.2f}ms {record.get('peak_mb', 0):8.1f}MB")
+    summary = summarize(records)
+    with open(args.output, "w") as f:
+        json.dump({"meta": {"python": platform.python_version(), "machine": platform.machine(),
+                            "time": time.strftime("%Y-%m-%d %H:%M:%S"), "args": vars(args)},
+                   "summary": summary, "records": records}, f, indent=1)
+    print(f"{len(records)} runs in {time.time()-s:.2f}s, results written to {args.output}")
+    if args.baseline:
+        regressions = compare(summary, load(args.baseline), args.threshold)
+        for line in regressions:
+            print("REGRESSION", line)
+        if regressions:
+            sys.exit(1)
+        print("no regression against", args.baseline)
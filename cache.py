@@ -0,0 +1,41 @@
+import hashlib
+import os
+from pathlib import Path
+from clausedb import ClauseDB
+import dimacs
+
+# 缓存目录，可由环境变量 DPLL_CACHE 指定
+CACHE_DIR = os.environ.get("DPLL_CACHE", os.path.join(Path.home(), ".cache", "cg-dpll"))
+
+
+def key(file: os.PathLike):
+    """缓存文件名：路径的哈希，加上文件的修改时间与大小"""
+    stat = os.stat(file)
+    digest = hashlib.blake2b(os.fsencode(os.path.realpath(file)), digest_size=16).hexdigest()
+    return f"{digest}-{stat.st_mtime_ns}-{stat.st_size}.cnfdb"
+
+
+def load(file: os.PathLike, cache_dir: os.PathLike = None):
+    """
+    读取 CNF 文件对应的子句库，返回 (db, header)，缓存命中时 header 为 None。
+    缓存未命中时解析文本并写入缓存，同一文件的旧缓存被删除。
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    name = key(file)
+    path = os.path.join(cache_dir, name)
+    if os.path.exists(path):
+        try:
+            return ClauseDB.load(path), None
+        except ValueError:
+            pass
+    db, header = dimacs.parse(file)
+    os.makedirs(cache_dir, exist_ok=True)
+    prefix = name.split("-")[0]
+    for old in os.listdir(cache_dir):
+        if old.startswith(prefix) and old != name:
+            os.remove(os.path.join(cache_dir, old))
+    # 先写入临时文件再改名，避免并发读取到不完整的缓存
+    temp = f"{path}.{os.getpid()}.tmp"
+    db.dump(temp)
+    os.replace(temp, path)
+    return db, header
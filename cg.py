@@ -1,5 +1,6 @@
+import heapq
 from enum import Enum
-from typing import List
+from typing import Iterable, List
 from function import Operator
 
 class NodeType(Enum):
@@ -7,6 +8,7 @@ class NodeType(Enum):
     BranchNode = 2
     
 class Node(object):
+    __slots__ = ('nt', 'op', 'prev_nodes', 'next_nodes', 'value')
     
     def __init__(self, nt: NodeType, op: Operator = None):
         super().__init__()
@@ -16,14 +18,96 @@ class Node(object):
         self.next_nodes: List[Node] = []
         self.value = None
 
+    def setValue(self, x):
+        self.value = x
+
     def compute(self):
+        """按拓扑序迭代地计算该节点及其全部前驱，图的深度不受递归深度限制"""
+        for node in topological([self]):
+            node.evaluate()
+        return self.value
+
+    def evaluate(self):
+        """由前驱的值计算该节点，不访问更远的前驱"""
         if self.nt == NodeType.LeafNode:
             if self.value is None:
                 raise RuntimeError("Unkonw value appears in leaf node.")
         elif self.nt == NodeType.BranchNode:
-            for node in self.prev_nodes:
-                node.compute()
             self.setValue(self.op(*self.prev_nodes))
         return self.value
-    
 
+
+def topological(outputs: Iterable[Node]) -> List[Node]:
+    """outputs 及其全部前驱的拓扑序(前驱在前)，用显式栈做后序深度优先遍历，共享的节点只出现一次"""
+    order = []
+    done = set()
+    for output in outputs:
+        if id(output) in done:
+            continue
+        done.add(id(output))
+        # (节点, 下一个要访问的前驱下标)
+        stack = [(output, 0)]
+        while stack:
+            node, i = stack[-1]
+            if i < len(node.prev_nodes):
+                stack[-1] = (node, i + 1)
+                prev = node.prev_nodes[i]
+                if id(prev) not in done:
+                    done.add(id(prev))
+                    stack.append((prev, 0))
+            else:
+                stack.pop()
+                order.append(node)
+    return order
+
+
+class Graph(object):
+    """
+    缓存拓扑序的计算图：evaluate() 按拓扑序计算全部节点，
+    叶节点的值改变后 update() 只重新计算其下游的节点，按拓扑序出堆，值不变的节点不再向后传递。
+    图的结构改变后需要重新建立。
+    """
+
+    def __init__(self, outputs: Iterable[Node]):
+        self.outputs = list(outputs)
+        self.order = topological(self.outputs)
+        # id(节点) -> 在拓扑序中的位置
+        self.position = {id(node): i for i, node in enumerate(self.order)}
+
+    def __len__(self):
+        return len(self.order)
+
+    def evaluate(self):
+        """计算全部节点，返回输出节点的值"""
+        for node in self.order:
+            node.evaluate()
+        return [output.value for output in self.outputs]
+
+    def update(self, changed: Iterable[Node]):
+        """changed 为值已经改变的节点(带否定的叶节点包括其否定)，重新计算受影响的下游节点，返回重新计算的节点数"""
+        order, position = self.order, self.position
+        heap = []
+        queued = set()
+
+        def push(node: Node):
+            for succ in node.next_nodes:
+                i = position.get(id(succ))
+                if i is not None and i not in queued:
+                    queued.add(i)
+                    heapq.heappush(heap, i)
+
+        for node in changed:
+            push(node)
+            # formula_for_common 中叶节点的 setValue 同时改变其否定 ~x
+            invert = getattr(node, "invert", None)
+            if invert is not None and node.nt == NodeType.LeafNode:
+                push(invert)
+        count = 0
+        while heap:
+            node = order[heapq.heappop(heap)]
+            old = node.value
+            node.evaluate()
+            count += 1
+            if node.value != old:
+                push(node)
+        return count
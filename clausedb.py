@@ -0,0 +1,145 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Iterable, List, Tuple
+from cg import NodeType
+from formula import Formula
+from function import op_or
+
+
+# dump() 文件头：标识、变元数、子句数、文字数、是否小端
+HEADER = struct.Struct("<8s4q")
+MAGIC = b"CLAUSEDB"
+
+
+def toLit(dimacs: int):
+    """DIMACS 整数 -> 文字编码 2*v + 符号，v 从 0 开始"""
+    return 2 * dimacs - 2 if dimacs > 0 else -2 * dimacs - 1
+
+
+def toDimacs(lit: int):
+    """文字编码 -> DIMACS 整数"""
+    return -(lit >> 1) - 1 if lit & 1 else (lit >> 1) + 1
+
+
+class ClauseDB:
+    """
+    扁平子句库：所有子句的文字连续存放在 lits 中，第 i 个子句为 lits[offsets[i]:offsets[i+1]]，
+    文字编码为 2*v + 符号(负文字为 1)，x 的否定即 lit ^ 1。
+    """
+    __slots__ = ('nvars', 'lits', 'offsets')
+
+    def __init__(self, nvars: int = 0):
+        self.nvars = nvars
+        self.lits = array('i')
+        self.offsets = array('q', [0])
+
+    def add(self, clause: Iterable[int]):
+        """以 DIMACS 整数加入一个子句(去掉重复文字)，返回子句下标"""
+        return self.addLits(dict.fromkeys(toLit(d) for d in clause))
+
+    def addLits(self, lits: Iterable[int]):
+        """以文字编码加入一个子句，返回子句下标"""
+        self.lits.extend(lits)
+        if len(self.lits) > self.offsets[-1]:
+            top = max(self.lits[self.offsets[-1]:]) >> 1
+            if top >= self.nvars:
+                self.nvars = top + 1
+        self.offsets.append(len(self.lits))
+        return len(self.offsets) - 2
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int):
+        return self.lits[self.offsets[index]:self.offsets[index + 1]]
+
+    def __iter__(self):
+        lits, offsets = self.lits, self.offsets
+        for i in range(len(offsets) - 1):
+            yield lits[offsets[i]:offsets[i + 1]]
+
+    def clauses(self):
+        """以 DIMACS 整数形式逐个返回子句"""
+        for clause in self:
+            yield [toDimacs(lit) for lit in clause]
+
+    @property
+    def nbytes(self):
+        return self.lits.itemsize * len(self.lits) + self.offsets.itemsize * len(self.offsets)
+
+    def header(self):
+        return HEADER.pack(MAGIC, self.nvars, len(self), len(self.lits), sys.byteorder == "little")
+
+    def dump(self, file: os.PathLike):
+        """以二进制形式保存：文件头之后依次为 offsets 与 lits 两个数组"""
+        with open(file, "wb") as f:
+            f.write(self.header())
+            self.offsets.tofile(f)
+            self.lits.tofile(f)
+
+    def tobytes(self):
+        """与 dump() 的文件内容相同的字节串"""
+        return self.header() + self.offsets.tobytes() + self.lits.tobytes()
+
+    @classmethod
+    def load(cls, file: os.PathLike):
+        """
+        读取 dump() 保存的文件：不需要重新解析文本，但 offsets 与 lits 仍从内存映射整体复制到 array 中，
+        因为求解器与化简会向子句库追加、修改子句，不能直接使用只读的映射。
+        """
+        with open(file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return cls.frombytes(buf, file)
+
+    @classmethod
+    def frombytes(cls, data, name: str = "data"):
+        """由 dump()/tobytes() 的内容构造子句库，data 可以是任何支持缓冲区协议的对象"""
+        if len(data) < HEADER.size:
+            raise ValueError(f"{name} is not a clause database of this platform.")
+        magic, nvars, nclauses, nlits, little = HEADER.unpack_from(data)
+        if magic != MAGIC or little != (sys.byteorder == "little"):
+            raise ValueError(f"{name} is not a clause database of this platform.")
+        db = cls(nvars)
+        with memoryview(data) as view:
+            start = HEADER.size
+            end = start + db.offsets.itemsize * (nclauses + 1)
+            if len(view) < end + db.lits.itemsize * nlits:
+                raise ValueError(f"{name} is truncated.")
+            db.offsets = array(db.offsets.typecode)
+            db.offsets.frombytes(view[start:end])
+            db.lits.frombytes(view[end:end + db.lits.itemsize * nlits])
+        return db
+
+    @classmethod
+    def fromFormulas(cls, forms: List[Formula], vars: List[Formula]):
+        """由 CNFParser 构造的图生成子句库"""
+        index = {}
+        for i, var in enumerate(vars):
+            index[var] = 2 * i
+            if var.invert is not None:
+                index[var.invert] = 2 * i + 1
+        db = cls(len(vars))
+        for form in forms:
+            db.addLits([index[lit] for lit in form.prev_nodes])
+        return db
+
+    def toFormulas(self) -> Tuple[List[Formula], List[Formula]]:
+        """根据子句库构造 Formula 图，返回 (forms, vars)"""
+        vars = [Formula() for i in range(self.nvars)]
+        forms = []
+        for clause in self:
+            form = Formula(NodeType.BranchNode, op=op_or)
+            form.length = 0
+            seen = set()
+            for lit in clause:
+                if lit in seen:
+                    continue
+                seen.add(lit)
+                atom = ~vars[lit >> 1] if lit & 1 else vars[lit >> 1]
+                form.prev_nodes.append(atom)
+                atom.next_nodes.append(form)
+                form.length += 1
+            forms.append(form)
+        return forms, vars
@@ -0,0 +1,339 @@
+import math
+from itertools import repeat
+from random import Random
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+from clausedb import ClauseDB
+from DPLL import DPLL, CDCL
+from search import Budget
+from solver import Solver
+
+
+def pack(model: Iterable[int], nvars: int) -> bytes:
+    """DIMACS 模型 -> 位数组：第 v 个变元为真时第 v-1 位为 1(小端位序，与 numpy.packbits(bitorder="little") 相同)"""
+    bits = 0
+    for d in model:
+        if 0 < d <= nvars:
+            bits |= 1 << (d - 1)
+    return bits.to_bytes((nvars + 7) // 8, "little")
+
+
+def unpack(data: bytes, nvars: int) -> List[int]:
+    """位数组 -> DIMACS 模型"""
+    bits = int.from_bytes(data, "little")
+    return [v if bits >> (v - 1) & 1 else -v for v in range(1, nvars + 1)]
+
+
+class Enumerator:
+    """
+    逐个枚举模型，记录个数以及是否已经枚举了全部模型。Solver 与 CDCL 使用 models()：每个模型之后加入否定全部假设与决策的阻塞子句，
+    决策经单元传播确定整个模型，因此阻塞子句只排除这一个模型且通常比模型短得多；子句在当前指派下全部为假，
+    求解器回跳到次高的决策层把它当作单元子句，不必从第 0 层重新搜索。学习子句、活跃度与相位一直保留，公式图不重建。
+    给出 projection(DIMACS 变元)时按投影枚举，每个投影只产生一次。
+    普通 DPLL 使用 DPLL.models() 的时间顺序回溯，不需要阻塞子句，也不支持假设与 projection。
+    模型以 pack() 的位数组给出，位的顺序为变元编号或 projection 中的顺序。
+    """
+
+    def __init__(self, solver: Union[Solver, DPLL], projection: Iterable[int] = None):
+        self.solver = solver
+        self.projection = list(projection) if projection is not None else None
+        self.chronological = not isinstance(solver, (Solver, CDCL))
+        if self.chronological and self.projection is not None:
+            raise ValueError("DPLL enumeration does not support projection, use CDCL or Solver.")
+        # 之后加入的辅助变元不出现在模型中
+        self.nvars = solver.db.nvars if isinstance(solver, Solver) else len(solver.vars)
+        # DPLL 的枚举只能进行一次，多次调用 models() 时继续同一个生成器，搜索限制为第一次调用给出的限制
+        self.generator = None
+        self.count = 0
+        # 上一次 models() 是否已经枚举了全部模型
+        self.complete = False
+
+    def pack(self, model: List[int]) -> bytes:
+        if self.projection is None:
+            return pack(model, self.nvars)
+        return pack([i + 1 if model[v - 1] > 0 else 0 for i, v in enumerate(self.projection)], len(self.projection))
+
+    def models(self, limit: int = None, assumptions: List[int] = (), conflicts: int = None,
+               propagations: int = None, timeout: float = None, interrupt=None) -> Iterator[bytes]:
+        """产生至多 limit 个模型，搜索限制对这一次调用计算，超出时结束且 complete 为 False"""
+        self.complete = False
+        if self.chronological:
+            if assumptions:
+                raise ValueError("DPLL enumeration does not support assumptions, use CDCL or Solver.")
+            if self.generator is None:
+                self.generator = self.solver.models(conflicts, propagations, timeout, interrupt)
+            generator = self.generator
+        else:
+            generator = self.solver.models(assumptions, self.projection, conflicts, propagations, timeout, interrupt)
+        found = 0
+        while limit is None or found < limit:
+            model = next(generator, False)
+            if model is None:
+                if self.chronological:
+                    self.generator = repeat(None)
+                return
+            if model is False:
+                self.complete = True
+                return
+            self.count += 1
+            found += 1
+            yield self.pack(model)
+
+    def __iter__(self):
+        return self.models()
+
+
+def models(db: ClauseDB, limit: int = None, projection: Iterable[int] = None, **kwargs) -> Iterator[bytes]:
+    """在子句库的副本上用 Solver 枚举模型"""
+    return Enumerator(Solver(ClauseDB.frombytes(db.tobytes())), projection).models(limit, **kwargs)
+
+
+class Counter:
+    """
+    精确模型计数(#SAT)：单元传播化简后按共享变元把子句分成连通分量，各分量的模型数相乘；
+    分量以其子句集合为键缓存(component caching)，在不同分支中重复出现的子问题只计算一次。
+    每个分量以出现次数最多的变元分裂，两个分支的模型数相加，分支中消失的变元各乘 2。
+    用生成器栈代替递归，分裂深度不受递归深度限制。
+    """
+
+    def __init__(self, db: ClauseDB):
+        self.nvars = db.nvars
+        self.clauses = [tuple(sorted(set(c))) for c in db.clauses()]
+        self.cache: Dict[frozenset, int] = {}
+        # 统计计数，conflicts 与 propagations 供 Budget 使用
+        self.conflicts = self.propagations = self.decisions = self.hits = 0
+
+    def condition(self, clauses: Iterable[tuple], lits: List[int]):
+        """指派 lits 并单元传播，返回 (剩余子句, 被指派的变元)，冲突时返回 None"""
+        true = set()
+        units = list(lits)
+        while units:
+            lit = units.pop()
+            if -lit in true:
+                return None
+            if lit in true:
+                continue
+            true.add(lit)
+            self.propagations += 1
+            rest = []
+            for c in clauses:
+                if lit in c:
+                    continue
+                if -lit in c:
+                    c = tuple(x for x in c if x != -lit)
+                    if not c:
+                        return None
+                    if len(c) == 1:
+                        units.append(c[0])
+                        continue
+                rest.append(c)
+            clauses = rest
+        return frozenset(clauses), {abs(lit) for lit in true}
+
+    @staticmethod
+    def components(clauses: frozenset) -> List[frozenset]:
+        """按共享变元划分连通分量(并查集)"""
+        parent = {}
+
+        def find(v):
+            while parent.setdefault(v, v) != v:
+                parent[v] = parent[parent[v]]
+                v = parent[v]
+            return v
+
+        for c in clauses:
+            root = find(abs(c[0]))
+            for lit in c[1:]:
+                other = find(abs(lit))
+                if other != root:
+                    parent[other] = root
+        groups = {}
+        for c in clauses:
+            groups.setdefault(find(abs(c[0])), []).append(c)
+        return [frozenset(g) for g in groups.values()]
+
+    def search(self, clauses: frozenset):
+        """子句集合在其变元上的模型数；分支的子问题通过 yield 交给 count() 计算"""
+        result = 1
+        for comp in self.components(clauses):
+            total = self.cache.get(comp)
+            if total is not None:
+                self.hits += 1
+            elif len(comp) == 1:
+                # 单个子句：只有全部文字为假的指派不满足
+                total = (1 << len(next(iter(comp)))) - 1
+            else:
+                occurrences = {}
+                for c in comp:
+                    for lit in c:
+                        occurrences[abs(lit)] = occurrences.get(abs(lit), 0) + 1
+                var = max(occurrences, key=occurrences.get)
+                total = 0
+                for lit in (var, -var):
+                    self.decisions += 1
+                    sub = self.condition(comp, [lit])
+                    if sub is None:
+                        self.conflicts += 1
+                        continue
+                    rest, assigned = sub
+                    free = len(occurrences) - len(assigned) - len({abs(x) for c in rest for x in c})
+                    total += (yield rest) << free
+                self.cache[comp] = total
+            result *= total
+            if not result:
+                break
+        return result
+
+    def count(self, conflicts: int = None, timeout: float = None, interrupt=None) -> Optional[int]:
+        """模型数，超出冲突次数、秒数限制或 interrupt() 返回真时返回 None"""
+        budget = Budget(self, conflicts, None, timeout, interrupt)
+        root = self.condition([c for c in self.clauses if len(c) > 1 and not any(-x in c for x in c)],
+                              [c[0] for c in self.clauses if len(c) == 1])
+        if any(not c for c in self.clauses) or root is None:
+            return 0
+        clauses, assigned = root
+        free = self.nvars - len(assigned) - len({abs(x) for c in clauses for x in c})
+        stack = [self.search(clauses)]
+        value = None
+        while stack:
+            try:
+                sub = stack[-1].send(value)
+            except StopIteration as e:
+                stack.pop()
+                value = e.value
+                continue
+            if budget.exceeded(self):
+                return None
+            stack.append(self.search(sub))
+            value = None
+        return value << free
+
+
+def xor(solver: Solver, vars: List[int], parity: bool, selector: int, fresh) -> None:
+    """加入 selector -> (vars 的异或 = parity)：链式引入辅助变元 t = a ^ b，辅助变元由 vars 唯一确定"""
+    if not vars:
+        if parity:
+            solver.add_clause([-selector])
+        return
+    acc = vars[0]
+    for x in vars[1:]:
+        t = fresh()
+        solver.add_clause([-t, acc, x])
+        solver.add_clause([-t, -acc, -x])
+        solver.add_clause([t, -acc, x])
+        solver.add_clause([t, acc, -x])
+        acc = t
+    solver.add_clause([-selector, acc if parity else -acc])
+
+
+def approx(db: ClauseDB, epsilon: float = 0.8, delta: float = 0.2, rounds: int = None, threshold: int = None,
+           seed: int = None, conflicts: int = None, timeout: float = None, interrupt=None) -> Optional[int]:
+    """
+    近似模型计数(ApproxMC)：加入 m 个随机异或约束把解空间随机切成约 2^m 份，在其中一份中最多枚举 threshold 个模型，
+    二分查找使模型数少于 threshold 的最小 m，估计值为该份的模型数乘 2^m，多轮估计取中位数。
+    以 1-delta 的概率落在精确值的 (1+epsilon) 倍以内。模型数本身少于 threshold 时直接返回精确值。
+    所有查询在同一个 Solver 上增量进行：异或约束与阻塞子句由假设的选择变元启用，查询结束后以单元子句关闭，
+    学习子句在各次查询间保留。超出限制时返回 None。
+    """
+    if threshold is None:
+        threshold = int(1 + 9.84 * (1 + epsilon / (1 + epsilon)) * (1 + 1 / epsilon) ** 2)
+    if rounds is None:
+        rounds = math.ceil(17 * math.log2(3 / delta))
+    rng = Random(seed)
+    n = db.nvars
+    solver = Solver(ClauseDB.frombytes(db.tobytes()))
+    enumerator = Enumerator(solver)
+    budget = Budget(solver, conflicts, None, timeout, interrupt)
+    top = n
+
+    def fresh():
+        nonlocal top
+        top += 1
+        return top
+
+    def bounded(selectors: List[int], m: int):
+        """启用前 m 个异或约束时的模型数，至多 threshold；约束在第一次用到时才生成"""
+        while len(selectors) < m:
+            selectors.append(fresh())
+            xor(solver, [v for v in range(1, n + 1) if rng.random() < 0.5], rng.random() < 0.5, selectors[-1], fresh)
+        b = fresh()
+        assumptions = selectors[:m] + [-s for s in selectors[m:]] + [b]
+        found = sum(1 for _ in enumerator.models(threshold, assumptions, **budget.remaining(solver)))
+        solver.add_clause([-b])
+        return found if found >= threshold or enumerator.complete else None
+
+    found = bounded([], 0)
+    if found is None or found < threshold:
+        return found
+    estimates = []
+    prev = None
+    for r in range(rounds):
+        # 每一轮使用新的异或约束，前 m 个约束构成嵌套的哈希。从上一轮的 m 开始查找(ApproxMC2)，
+        # 模型数不少于 threshold 时 m 倍增，否则先试 m-1，之后二分
+        selectors = []
+        counts = {}
+        lo, hi, m = 0, None, prev or 1
+        near = prev is not None
+        while True:
+            counts[m] = bounded(selectors, m)
+            if counts[m] is None:
+                return None
+            if counts[m] >= threshold:
+                lo = m
+                if m == n:
+                    hi = m
+            else:
+                hi = m
+            if hi is not None and hi - lo <= 1:
+                break
+            if hi is None:
+                m, near = min(2 * m, n), False
+            elif near:
+                m, near = hi - 1, False
+            else:
+                m = (lo + hi) // 2
+        prev = hi
+        estimates.append(counts[hi] << hi)
+        for s in selectors:
+            solver.add_clause([-s])
+    estimates.sort()
+    return estimates[len(estimates) // 2]
+
+
+def count(db: ClauseDB, approximate: bool = False, **kwargs) -> Optional[int]:
+    """模型数：默认用 Counter 精确计数，approximate 时为 approx() 的估计，超出限制时返回 None"""
+    if approximate:
+        return approx(db, **kwargs)
+    return Counter(db).count(**kwargs)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    import dimacs
+
+    parser = argparse.ArgumentParser(description="model enumeration and counting")
+    parser.add_argument("path", help="DIMACS file")
+    parser.add_argument("--enumerate", type=int, default=None, metavar="N", help="print up to N models")
+    parser.add_argument("--approx", action="store_true", help="approximate counting with random XOR constraints")
+    parser.add_argument("--epsilon", type=float, default=0.8)
+    parser.add_argument("--delta", type=float, default=0.2)
+    parser.add_argument("--rounds", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=None, help="seconds")
+    args = parser.parse_args()
+
+    db = dimacs.parse(args.path)[0]
+    s = time.time()
+    if args.enumerate is not None:
+        enumerator = Enumerator(Solver(db))
+        for bits in enumerator.models(args.enumerate, timeout=args.timeout):
+            print("v", " ".join(map(str, unpack(bits, enumerator.nvars))), "0")
+        print(f"c {enumerator.count} models{' (all)' if enumerator.complete else ''} in {time.time()-s:.4f}s")
+    elif args.approx:
+        result = approx(db, args.epsilon, args.delta, args.rounds, seed=args.seed, timeout=args.timeout)
+        print("UNKNOWN" if result is None else f"~{result}", f"in {time.time()-s:.4f}s")
+    else:
+        counter = Counter(db)
+        result = counter.count(timeout=args.timeout)
+        print("UNKNOWN" if result is None else result, f"in {time.time()-s:.4f}s",
+              f"({counter.decisions} decisions, {counter.hits} cache hits)")
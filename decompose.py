@@ -0,0 +1,208 @@
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError, as_completed
+from typing import List, Optional, Tuple, Union
+from clausedb import ClauseDB
+from DPLL import DPLL, CDCL
+from formula import Formula
+from solver import Solver
+
+# 子句数达到该值的分量放到进程池中求解，较小的分量在当前进程中直接求解
+MIN_SIZE = 2000
+
+# 工作进程中的共享停止标志，由进程池的 initializer 设置
+_stop = None
+
+
+def components(forms: List[Formula], vars: List[Formula]) -> List[Tuple[List[Formula], List[Formula]]]:
+    """
+    沿 文字 -> 子句(Formula.getFormulas，即 next_nodes) 与 子句 -> 文字(prev_nodes) 的图划分连通分量，
+    返回各分量的 (子句, 变元)，变元保持在 vars 中的顺序。不出现在任何子句中的变元不属于任何分量，空子句单独成为一个分量。
+    """
+    index = {}
+    for i, var in enumerate(vars):
+        index[var] = i
+        if var.invert is not None:
+            index[var.invert] = i
+    clauses = set(forms)
+    seen = bytearray(len(vars))
+    visited = set()
+    result = [([form], []) for form in forms if not form.prev_nodes]
+    for start in range(len(vars)):
+        if seen[start]:
+            continue
+        seen[start] = 1
+        stack, found, comp = [start], [start], []
+        while stack:
+            var = vars[stack.pop()]
+            for atom in (var, var.invert):
+                if atom is None:
+                    continue
+                for form in Formula.getFormulas(atom):
+                    if form in visited or form not in clauses:
+                        continue
+                    visited.add(form)
+                    comp.append(form)
+                    for lit in form.prev_nodes:
+                        j = index[lit]
+                        if not seen[j]:
+                            seen[j] = 1
+                            found.append(j)
+                            stack.append(j)
+        if comp:
+            result.append((comp, [vars[j] for j in sorted(found)]))
+    return result
+
+
+def split(db: ClauseDB) -> List[Tuple[ClauseDB, List[int]]]:
+    """
+    按共享变元(并查集)把子句库划分为连通分量，返回各分量的 (子句库, 原变元)：
+    分量中的变元重新从 1 编号，原变元[i] 为第 i+1 个变元在 db 中的 DIMACS 编号。
+    """
+    lits, offsets = db.lits, db.offsets
+    parent = list(range(db.nvars))
+
+    def find(v):
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    for c in range(len(db)):
+        start, end = offsets[c], offsets[c + 1]
+        if start == end:
+            continue
+        root = find(lits[start] >> 1)
+        for k in range(start + 1, end):
+            other = find(lits[k] >> 1)
+            if other != root:
+                parent[other] = root
+    groups = {}
+    for c in range(len(db)):
+        start, end = offsets[c], offsets[c + 1]
+        # 空子句单独成为一个分量
+        groups.setdefault(find(lits[start] >> 1) if start < end else -1 - c, []).append(c)
+    parts = []
+    for clauses in groups.values():
+        number = {}
+        sub = ClauseDB()
+        for c in clauses:
+            sub.addLits([2 * number.setdefault(lit >> 1, len(number)) + (lit & 1) for lit in db[c]])
+        sub.nvars = len(number)
+        parts.append((sub, [v + 1 for v in number]))
+    return parts
+
+
+def _init(stop):
+    global _stop
+    _stop = stop
+
+
+def _solve(db: ClauseDB, solver: str = "solver", deadline: float = None, **kwargs):
+    """
+    求解一个分量，返回 (结果, DIMACS 模型)；在工作进程中由共享标志提前停止。
+    deadline 为整体的截止时刻(time.time())，在队列中等待的任务开始时只得到剩余的时间。
+    """
+    interrupt = (lambda: _stop.value) if _stop is not None else None
+    timeout = None if deadline is None else max(deadline - time.time(), 0.0)
+    if solver == "solver":
+        engine = Solver(db, **kwargs)
+    else:
+        forms, vars = db.toFormulas()
+        engine = (CDCL if solver == "cdcl" else DPLL)(forms, vars, **kwargs)
+    result = engine.solve(timeout=timeout, interrupt=interrupt)
+    return result, engine.model() if result else None
+
+
+def solve(source: Union[ClauseDB, Tuple[List[Formula], List[Formula]]], workers: int = None,
+          min_size: int = MIN_SIZE, solver: str = "solver", timeout: float = None,
+          **kwargs) -> Tuple[Optional[bool], Optional[List[int]]]:
+    """
+    把公式分解为互不共享变元的分量后分别求解，返回 (result, model)，model 为合并后的 DIMACS 模型，
+    不出现在子句中的变元取真。source 为 ClauseDB 或 (forms, vars) 图。
+    子句数不少于 min_size 的分量在 workers 个进程中求解(只有一个这样的分量时直接求解)，其余分量在当前进程中求解。
+    一个分量不可满足时整个公式不可满足，其余分量立即停止：未开始的任务被取消，正在求解的进程通过共享标志在下一次冲突时停止。
+    超时或某个分量为 UNKNOWN 时 result 为 None。kwargs 传给求解器(heuristic、restart 等)。
+    """
+    if isinstance(source, ClauseDB):
+        nvars = source.nvars
+        parts = split(source)
+    else:
+        forms, vars = source
+        nvars = len(vars)
+        position = {var: i for i, var in enumerate(vars)}
+        parts = [(ClauseDB.fromFormulas(f, v), [position[var] + 1 for var in v]) for f, v in components(forms, vars)]
+    # 先求解小的分量，尽早发现不可满足的部分
+    parts.sort(key=lambda part: len(part[0]))
+    large = [part for part in parts if len(part[0]) >= min_size]
+    if len(large) < 2 or workers == 1:
+        large = []
+    small = parts[:len(parts) - len(large)]
+    deadline = None if timeout is None else time.time() + timeout
+    model = list(range(1, nvars + 1))
+
+    def merge(mapping: List[int], sub: List[int]):
+        for v, d in zip(mapping, sub):
+            model[v - 1] = v if d > 0 else -v
+
+    pool = None
+    if large:
+        ctx = mp.get_context()
+        stop = ctx.RawValue("b", 0)
+        pool = ProcessPoolExecutor(min(workers or os.cpu_count(), len(large)), mp_context=ctx,
+                                   initializer=_init, initargs=(stop,))
+    try:
+        futures = {pool.submit(_solve, db, solver, deadline, **kwargs): mapping for db, mapping in large}
+        answer = True
+        for db, mapping in small:
+            result, sub = _solve(db, solver, deadline, **kwargs)
+            if result is False:
+                return False, None
+            if result is None:
+                answer = None
+            else:
+                merge(mapping, sub)
+        left = None if deadline is None else max(deadline - time.time(), 0.0)
+        try:
+            # 工作进程在截止时刻自行停止，这里的等待也不超过剩余的时间
+            for future in as_completed(futures, timeout=left):
+                result, sub = future.result()
+                if result is False:
+                    return False, None
+                if result is None:
+                    answer = None
+                else:
+                    merge(futures[future], sub)
+        except TimeoutError:
+            return None, None
+        return answer, model if answer else None
+    finally:
+        if pool is not None:
+            stop.value = 1
+            pool.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    import dimacs
+
+    parser = argparse.ArgumentParser(description="solve the variable-disjoint components of a CNF file separately")
+    parser.add_argument("cnf")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--min-size", type=int, default=MIN_SIZE, help="clauses of a component solved in a process")
+    parser.add_argument("--solver", choices=["solver", "cdcl", "dpll"], default="solver")
+    parser.add_argument("--timeout", type=float, default=None)
+    args = parser.parse_args()
+
+    db = dimacs.parse(args.cnf)[0]
+    s = time.time()
+    parts = split(db)
+    print(f"{len(parts)} components, largest {max((len(p[0]) for p in parts), default=0)} clauses, "
+          f"split in {1e3*(time.time()-s):.4f}ms")
+    s = time.time()
+    result, model = solve(db, args.workers, args.min_size, args.solver, args.timeout)
+    print("SAT result :", "UNKNOWN" if result is None else result)
+    print(f"solved in {1e3*(time.time()-s):.4f}ms")
+    if model:
+        print("v", " ".join(map(str, model)), "0")
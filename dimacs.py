@@ -0,0 +1,122 @@
+import bz2
+import gzip
+import lzma
+import mmap
+import os
+from typing import Iterable, Tuple
+from clausedb import ClauseDB
+
+# 每次读取的字节数，块在换行处截断
+CHUNK = 1 << 20
+
+# 压缩格式按后缀透明解压
+OPENERS = {".gz": gzip.open, ".xz": lzma.open, ".bz2": bz2.open}
+SUFFIXES = (".cnf",) + tuple(".cnf" + suffix for suffix in OPENERS)
+
+
+def chunks(file: os.PathLike, size: int = None):
+    """按块读取文件，每块以换行结束；未压缩的文件使用内存映射"""
+    size = size or CHUNK
+    opener = OPENERS.get(os.path.splitext(file)[1].lower())
+    if opener is not None:
+        with opener(file, "rb") as f:
+            rest = b""
+            while True:
+                block = f.read(size)
+                if not block:
+                    break
+                block = rest + block
+                end = block.rfind(b"\n") + 1
+                rest = block[end:]
+                if end:
+                    yield block[:end]
+            if rest:
+                yield rest
+        return
+    with open(file, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            start, n = 0, len(buf)
+            while start < n:
+                end = n
+                if start + size < n:
+                    end = buf.rfind(b"\n", start, start + size) + 1
+                    if end <= start:
+                        end = buf.find(b"\n", start + size) + 1 or n
+                yield buf[start:end]
+                start = end
+
+
+def parse(file: os.PathLike, db: ClauseDB = None) -> Tuple[ClauseDB, Tuple[int, int]]:
+    """
+    流式解析 DIMACS 文件并直接填充子句库，返回 (db, (变元数, 子句数))，没有 p 行时头部为 None。
+    文字之间可以是任意空白，子句可以跨行，以 0 结束；c 开头为注释，% 之后的内容被忽略。
+    """
+    return feed(chunks(file), db)
+
+
+def loads(data: bytes, db: ClauseDB = None) -> Tuple[ClauseDB, Tuple[int, int]]:
+    """解析内存中的 DIMACS 文本，返回值与 parse() 相同"""
+    return feed([data], db)
+
+
+def feed(chunks: Iterable[bytes], db: ClauseDB = None) -> Tuple[ClauseDB, Tuple[int, int]]:
+    """把按块给出的 DIMACS 文本填充到子句库，子句可以跨块，每块须在行尾结束"""
+    if db is None:
+        db = ClauseDB()
+    lits, offsets = db.lits, db.offsets
+    header = None
+    # 上一块中尚未结束的子句
+    pending = []
+    for chunk in chunks:
+        done = False
+        # 数字中不会出现这些字符，只有包含它们的块才需要逐行处理
+        if b"c" in chunk or b"p" in chunk or b"%" in chunk:
+            lines = []
+            for line in chunk.split(b"\n"):
+                head = line.lstrip()[:1]
+                if head == b"c":
+                    continue
+                elif head == b"p":
+                    infos = line.split()
+                    header = (int(infos[2]), int(infos[3]))
+                    db.nvars = max(db.nvars, header[0])
+                elif head == b"%":
+                    done = True
+                    break
+                else:
+                    lines.append(line)
+            chunk = b" ".join(lines)
+        # 整块转换为文字编码，子句结尾的 0 编码为 -1
+        encoded = pending + [2 * d - 2 if d > 0 else -2 * d - 1 for d in map(int, chunk.split())]
+        if encoded:
+            top = max(encoded) >> 1
+            if top >= db.nvars:
+                db.nvars = top + 1
+        start = 0
+        for end in [i for i, lit in enumerate(encoded) if lit < 0]:
+            clause = encoded[start:end]
+            if len(set(clause)) < len(clause):
+                clause = list(dict.fromkeys(clause))
+            lits.extend(clause)
+            offsets.append(len(lits))
+            start = end + 1
+        pending = encoded[start:]
+        if done:
+            break
+    # 文件末尾缺少 0 的子句
+    if pending:
+        db.addLits(dict.fromkeys(pending))
+    return db, header
+
+
+def write(file: os.PathLike, db: ClauseDB, comments: Tuple[str, ...] = ()):
+    """把子句库写为 DIMACS 文件，后缀为 .gz/.xz/.bz2 时压缩"""
+    opener = OPENERS.get(os.path.splitext(file)[1].lower(), open)
+    with opener(file, "wt") as f:
+        for comment in comments:
+            f.write(f"c {comment}\n")
+        f.write(f"p cnf {db.nvars} {len(db)}\n")
+        for clause in db.clauses():
+            f.write(" ".join(map(str, clause)) + " 0\n")
@@ -0,0 +1,128 @@
+from array import array
+from functools import reduce
+from operator import or_
+from typing import Iterable, List, Sequence
+from clausedb import ClauseDB
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class Evaluator:
+    """
+    批量计算子句是否被满足。子句取自 ClauseDB(建立时复制，之后子句库的变化不影响结果)，
+    指派为 DIMACS 模型(如 Solver.model() 的结果)，有 numpy 时也可以是 (指派数, 变元数) 的 0/1 矩阵。
+    有 numpy 时把所有指派的全部文字一次算出，再按子句用 logical_or.reduceat 归约；
+    没有 numpy 时每个文字对应一个整数，第 j 位表示第 j 个指派下该文字为真，子句为这些整数按位或。
+    """
+
+    def __init__(self, db: ClauseDB, use_numpy: bool = None):
+        self.nvars = db.nvars
+        self.size = len(db)
+        self.numpy = np is not None if use_numpy is None else use_numpy
+        if self.numpy:
+            lits = np.frombuffer(db.lits, dtype=np.int32)[:db.offsets[self.size]].copy()
+            offsets = np.frombuffer(db.offsets, dtype=np.int64)[:self.size + 1].copy()
+            self.var = lits >> 1
+            self.sign = (lits & 1).astype(bool)
+            # 文字矩阵末尾补一列假值，使空子句的起点也是合法下标，空子句的结果再单独置为不满足
+            self.starts = offsets[:-1]
+            self.empty = offsets[1:] == offsets[:-1]
+        else:
+            self.lits = array('i', db.lits[:db.offsets[self.size]])
+            self.offsets = array('q', db.offsets[:self.size + 1])
+
+    def matrix(self, models):
+        """指派 -> (指派数, 变元数) 的布尔矩阵，未出现的变元取假"""
+        if isinstance(models, np.ndarray):
+            return models.astype(bool, copy=False).reshape(-1, self.nvars)
+        values = np.zeros((len(models), self.nvars), dtype=bool)
+        for j, model in enumerate(models):
+            model = np.asarray(model, dtype=np.int64)
+            model = model[(model != 0) & (np.abs(model) <= self.nvars)]
+            values[j, np.abs(model) - 1] = model > 0
+        return values
+
+    def masks(self, models: Sequence[Iterable[int]]):
+        """指派 -> 以文字为下标的位掩码"""
+        masks = [0] * (2 * self.nvars)
+        for j, model in enumerate(models):
+            bit = 1 << j
+            for d in model:
+                if 0 < d <= self.nvars:
+                    masks[2 * d - 2] |= bit
+        full = (1 << len(models)) - 1
+        for v in range(self.nvars):
+            masks[2 * v + 1] = full ^ masks[2 * v]
+        return masks, full
+
+    def satisfied(self, models):
+        """
+        每个子句在各个指派下是否被满足：numpy 时为 (指派数, 子句数) 的布尔矩阵，
+        否则为每个子句一个整数，第 j 位为 1 表示被第 j 个指派满足。
+        """
+        if self.numpy:
+            values = self.matrix(models)
+            lits = np.zeros((len(values), len(self.var) + 1), dtype=bool)
+            np.not_equal(values[:, self.var], self.sign, out=lits[:, :-1])
+            if not self.size:
+                return lits[:, :0]
+            sat = np.logical_or.reduceat(lits, self.starts, axis=1)
+            sat[:, self.empty] = False
+            return sat
+        masks, full = self.masks(models)
+        lits, offsets = self.lits, self.offsets
+        get = masks.__getitem__
+        return [reduce(or_, map(get, lits[offsets[c]:offsets[c + 1]]), 0) for c in range(self.size)]
+
+    def count(self, models) -> List[int]:
+        """每个指派满足的子句数"""
+        if self.numpy:
+            return self.satisfied(models).sum(axis=1).tolist()
+        n = len(models)
+        counts = [self.size] * n
+        full = (1 << n) - 1
+        for mask in self.satisfied(models):
+            missed = full ^ mask
+            while missed:
+                low = missed & -missed
+                counts[low.bit_length() - 1] -= 1
+                missed ^= low
+        return counts
+
+    def unsat(self, model: Iterable[int]) -> List[int]:
+        """单个指派下不满足的子句下标"""
+        if self.numpy:
+            return np.flatnonzero(~self.satisfied([list(model)])[0]).tolist()
+        return [c for c, mask in enumerate(self.satisfied([model])) if not mask]
+
+    def check(self, model: Iterable[int]) -> bool:
+        """单个指派是否满足全部子句"""
+        if self.numpy:
+            return bool(self.satisfied([list(model)]).all())
+        return all(self.satisfied([model]))
+
+
+def check(db: ClauseDB, model: Iterable[int]) -> bool:
+    """验证模型满足子句库中的全部子句"""
+    return Evaluator(db).check(model)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    import dimacs
+    from solver import Solver
+
+    db = dimacs.parse(sys.argv[1])[0]
+    s = time.time()
+    evaluator = Evaluator(db)
+    print(f"build in {1e3*(time.time()-s):.4f}ms ({'numpy' if evaluator.numpy else 'bit-parallel'})")
+    solver = Solver(db)
+    if solver.solve():
+        model = solver.model()
+        s = time.time()
+        print("model check :", evaluator.check(model))
+        print(f"checked {evaluator.size} clauses in {1e3*(time.time()-s):.4f}ms")
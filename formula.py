@@ -1,3 +1,6 @@
+from array import array
+from itertools import accumulate
+from typing import List
 from cg import Node, NodeType
 from function import op_and, op_or, op_identity, Operator
 
@@ -5,6 +8,8 @@ from function import op_and, op_or, op_identity, Operator
 # TODO: store numebr of True atoms
 class Formula(Node): ...
 class Formula(Node):
+    __slots__ = ('invert', 'assigned', 'sid', 'id', 'atoms', 'forms', 'length', 'visited', 'true_atoms',
+                 'watches', 'level', 'reason', 'index', 'occ')
     ID = 1
     def __init__(self, nt: NodeType = NodeType.LeafNode, op: Operator = op_identity, sformat: str = "A"):
         super().__init__(nt, op)
@@ -18,6 +23,15 @@ class Formula(Node):
         self.length = 1
         self.visited = None 
         self.true_atoms = 0
+        # 监视该文字的子句（watched-literal 模式）
+        self.watches = []
+        # 指派所在的决策层以及推出该指派的子句
+        self.level = 0
+        self.reason = None
+        # 变元在求解器中的下标，x 与 ~x 相同
+        self.index = None
+        # 求解器建立的出现索引，getFormulas() 优先使用
+        self.occ = None
 
     def __or__(self, f: Formula):
         if self.nt == NodeType.LeafNode and f.nt == NodeType.LeafNode:
@@ -47,8 +61,13 @@ class Formula(Node):
         if self.invert is None:
             form = Formula(NodeType.LeafNode)
             form.sid = f'(~{self.sid})'
+            form.index = self.index
+            form.occ = self.occ
             self.invert = form
             form.invert = self
+            # 求解过程中才创建的否定需要与已有的指派保持一致
+            if self.assigned:
+                form.set(not self.value, self.reason, self.level)
         else: form = self.invert
         return form
 
@@ -96,7 +115,6 @@ class Formula(Node):
 
     def update(self, assigned: bool = True):
         """更新当前节点状态并传递给其所在的公式"""
-        forms = Formula.getFormulas(self)
         if assigned and not self.assigned:
             forms = Formula.getFormulas(self)
             for f in forms:
@@ -126,6 +144,61 @@ class Formula(Node):
         if not invert and self.invert is not None:
             self.invert.assign(not value, True)
     
+    def set(self, value: int, reason: Formula = None, level: int = 0):
+        """watched-literal 模式下的指派，只修改该文字及其否定的状态"""
+        self.value = value != 0
+        self.assigned = True
+        self.reason = reason
+        self.level = level
+        inv = self.invert
+        if inv is not None:
+            inv.value = value == 0
+            inv.assigned = True
+            inv.reason = reason
+            inv.level = level
+
+    def unset(self):
+        """撤销set()的指派"""
+        self.value = None
+        self.assigned = False
+        if self.invert is not None:
+            self.invert.value = None
+            self.invert.assigned = False
+
+    def propagate(self, units: list, level: int = 0):
+        """该文字刚被置假，只访问监视它的子句：移动监视文字或推出单元文字(追加到units)，返回冲突子句"""
+        watches = self.watches
+        i = j = 0
+        n = len(watches)
+        while i < n:
+            form = watches[i]
+            i += 1
+            # 保证被置假的文字位于 prev_nodes[1]
+            lits = form.prev_nodes
+            if lits[0] is self:
+                lits[0], lits[1] = lits[1], self
+            first = lits[0]
+            if first.value:
+                watches[j] = form
+                j += 1
+                continue
+            for k in range(2, len(lits)):
+                if lits[k].value is not False:
+                    lits[1], lits[k] = lits[k], self
+                    lits[1].watches.append(form)
+                    break
+            else:
+                watches[j] = form
+                j += 1
+                if first.value is None:
+                    first.set(1, form, level)
+                    units.append(first)
+                else:
+                    watches[j:] = watches[i:]
+                    return form
+        del watches[j:]
+        return None
+
     def isSatisfied(self): 
         """是否SAT"""
         if self.value is not None:
@@ -154,19 +227,23 @@ class Formula(Node):
 
     @staticmethod
     def getFormulas(formula: Formula):
-        """利用原子公式获取公式"""
-        def inner(formula: Formula):
-            if not formula.next_nodes: 
-                # ignore atom
-                if formula.prev_nodes: return [formula]
-                else: return []
-            nodes = []
-            # ignore single node
-            for node in formula.next_nodes:
-                nodes += inner(node)
-            return nodes
+        """
+        利用原子公式获取公式。由求解器建立了出现索引时直接查索引，
+        否则沿 next_nodes 迭代找到最上层的公式，按首次访问的顺序缓存为元组。
+        """
+        if formula.occ is not None:
+            return formula.occ[formula]
         if formula.forms is None:
-            formula.forms = set(inner(formula))
+            found = {}
+            stack = [formula]
+            while stack:
+                node = stack.pop()
+                if node.next_nodes:
+                    stack.extend(reversed(node.next_nodes))
+                # ignore atom
+                elif node.prev_nodes:
+                    found[node] = None
+            formula.forms = tuple(found)
         return formula.forms
 
     @staticmethod
@@ -183,6 +260,47 @@ class Formula(Node):
     # def __del__(self): 
     #     print('freed node :', self.sid))
 
+
+class Occurrences(object):
+    """
+    CSR 形式的出现索引：文字编号为 2*index(原子) 与 2*index+1(否定)，
+    clauses[offsets[l]:offsets[l+1]] 为包含文字 l 的子句在 forms 中的下标，按 forms 的顺序排列。
+    建立后不再修改，之后加入的子句记录在 extra 中。
+    """
+    __slots__ = ('vars', 'forms', 'offsets', 'clauses', 'extra')
+
+    def __init__(self, forms: List[Formula], vars: List[Formula]):
+        self.vars = vars
+        self.forms = list(forms)
+        counts = [0] * (2 * len(vars) + 1)
+        for form in self.forms:
+            for lit in dict.fromkeys(map(self.lit, form.prev_nodes)):
+                counts[lit + 1] += 1
+        self.offsets = array('q', accumulate(counts))
+        self.clauses = array('i', bytes(4 * self.offsets[-1]))
+        fill = array('q', self.offsets)
+        for c, form in enumerate(self.forms):
+            for lit in dict.fromkeys(map(self.lit, form.prev_nodes)):
+                self.clauses[fill[lit]] = c
+                fill[lit] += 1
+        self.extra = {}
+
+    def lit(self, atom: Formula):
+        return 2 * atom.index + (atom is not self.vars[atom.index])
+
+    def __getitem__(self, atom: Formula):
+        lit = self.lit(atom)
+        forms, offsets = self.forms, self.offsets
+        # 建立索引之后才加入的变元只出现在 extra 中
+        found = [forms[c] for c in self.clauses[offsets[lit]:offsets[lit + 1]]] if lit + 1 < len(offsets) else []
+        if lit in self.extra:
+            found += self.extra[lit]
+        return found
+
+    def add(self, form: Formula):
+        for lit in dict.fromkeys(map(self.lit, form.prev_nodes)):
+            self.extra.setdefault(lit, []).append(form)
+
 if __name__ == "__main__":
     fs = [Formula() for i in range(3)]
     # d = fs[2] | fs[2] | (fs[1] & fs[0]) | (fs[2] & fs[2])
@@ -1,4 +1,4 @@
-from typing import Union
+from typing import Any, Union
 from cg import *
 from function import op_and, op_or, op_identity
 
@@ -74,9 +74,16 @@ class Formula(Node):
             
     @staticmethod
     def backward(node: Node, visit, result: Any = None):
-        for n in node.prev_nodes:
-            result = Formula.backward(n, visit, result)
-        return visit(node, result)
+        """后序遍历(前驱从左到右，最后是节点自身)，用显式栈代替递归"""
+        stack = [(node, False)]
+        while stack:
+            n, expanded = stack.pop()
+            if expanded:
+                result = visit(n, result)
+            else:
+                stack.append((n, True))
+                stack.extend((p, False) for p in reversed(n.prev_nodes))
+        return result
 
     def __str__(self): 
         if self.nt == NodeType.BranchNode:
@@ -124,36 +131,36 @@ class Formula(Node):
 
     @staticmethod
     def getFormulas(formula):
-        def inner(formula: Formula):
-            if not formula.next_nodes: 
-                # ignore atom
-                if formula.prev_nodes: return [formula]
-                else: return []
-            nodes = []
-            # ignore single node
-            for node in formula.next_nodes:
-                nodes += inner(node)
-            return nodes
+        """沿 next_nodes 迭代找到最上层的公式"""
         if formula.forms is None:
-            formula.forms = set(inner(formula))
+            formula.forms = set()
+            stack = [formula]
+            while stack:
+                node = stack.pop()
+                if node.next_nodes:
+                    stack.extend(node.next_nodes)
+                # ignore atom
+                elif node.prev_nodes:
+                    formula.forms.add(node)
         return formula.forms
 
     @staticmethod
     def getAtoms(formula):
-        def inner(node):
-            node.visited = formula.id
-            if node.nt == NodeType.LeafNode:
-                formula.atoms.append(node)
-                formula.length += 1
-                if node.invert is not None:
-                    return node.invert.visited == node.visited
-                else: return False
-            ret = False
-            for n in node.prev_nodes:
-                ret |= inner(n)
-            return ret
+        """先序遍历收集原子，A 与 ~A 均出现时公式为永真式"""
         if formula.store_true is None:
-            formula.store_true = inner(formula)
+            ret = False
+            stack = [formula]
+            while stack:
+                node = stack.pop()
+                node.visited = formula.id
+                if node.nt == NodeType.LeafNode:
+                    formula.atoms.append(node)
+                    formula.length += 1
+                    if node.invert is not None:
+                        ret |= node.invert.visited == node.visited
+                else:
+                    stack.extend(reversed(node.prev_nodes))
+            formula.store_true = ret
         return formula.store_true
     
     # def __del__(self): 
@@ -0,0 +1,229 @@
+from random import Random
+from typing import Callable, Iterable, List
+
+
+class Heuristic(object):
+    """
+    分支启发式，变元用下标 0..n-1 表示，子句用 DIMACS 形式的整数列表表示。
+    未指派的变元保存在以 score 为键的二叉堆中，pick() 取出 score 最大的未指派变元，
+    被指派的变元在 pick() 时才从堆中惰性删除，回溯时由 unassign() 重新插入。
+    """
+    name = ''
+
+    def __init__(self, nvars: int, save_phase: bool = True):
+        super().__init__()
+        self.nvars = nvars
+        self.save_phase = save_phase
+        self.score = [0.0] * nvars
+        # 决策时为变元指派的值
+        self.phase = [False] * nvars
+        self.heap: List[int] = []
+        # 变元在堆中的位置，不在堆中为 -1
+        self.pos = [-1] * nvars
+
+    def init(self, clauses: Iterable[Iterable[int]]):
+        """根据初始子句计算 score 与初始相位，并建立堆"""
+        self.heap = sorted(range(self.nvars), key=lambda v: -self.score[v])
+        for i, v in enumerate(self.heap):
+            self.pos[v] = i
+
+    def grow(self, nvars: int):
+        """增加变元到 nvars 个，新变元直接加入堆中"""
+        while self.nvars < nvars:
+            var = self.nvars
+            self.nvars += 1
+            self.score.append(self.initial(var))
+            self.phase.append(False)
+            self.pos.append(-1)
+            self.push(var)
+
+    def initial(self, var: int):
+        """新变元的初始 score"""
+        return 0.0
+
+    def randomize(self, rng: Random):
+        """随机扰动 score 的次序与初始相位，用于让多个求解器走不同的搜索路径"""
+        for v in range(self.nvars):
+            r = rng.random()
+            self.score[v] = self.score[v] * (1 + 1e-2 * r) + 1e-6 * r
+            self.phase[v] = rng.random() < 0.5
+        # 降序排列的数组满足堆的性质
+        self.heap.sort(key=lambda v: -self.score[v])
+        for i, v in enumerate(self.heap):
+            self.pos[v] = i
+
+    def pick(self, assigned: Callable[[int], bool]):
+        """返回 score 最大的未指派变元，全部指派时返回 -1"""
+        while self.heap:
+            var = self.pop()
+            if not assigned(var):
+                return var
+        return -1
+
+    def unassign(self, var: int, value: bool):
+        """回溯撤销变元的指派，保存其相位并放回堆中"""
+        if self.save_phase:
+            self.phase[var] = bool(value)
+        if self.pos[var] < 0:
+            self.push(var)
+
+    def bump(self, var: int):
+        """变元参与了冲突"""
+        pass
+
+    def decay(self):
+        """一次冲突结束"""
+        pass
+
+    def push(self, var: int):
+        self.pos[var] = len(self.heap)
+        self.heap.append(var)
+        self.up(self.pos[var])
+
+    def pop(self):
+        heap = self.heap
+        top = heap[0]
+        last = heap.pop()
+        self.pos[top] = -1
+        if heap:
+            heap[0] = last
+            self.pos[last] = 0
+            self.down(0)
+        return top
+
+    def up(self, i: int):
+        heap, pos, score = self.heap, self.pos, self.score
+        var = heap[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            if score[heap[parent]] >= score[var]:
+                break
+            heap[i] = heap[parent]
+            pos[heap[i]] = i
+            i = parent
+        heap[i] = var
+        pos[var] = i
+
+    def down(self, i: int):
+        heap, pos, score = self.heap, self.pos, self.score
+        var = heap[i]
+        n = len(heap)
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            if child + 1 < n and score[heap[child + 1]] > score[heap[child]]:
+                child += 1
+            if score[heap[child]] <= score[var]:
+                break
+            heap[i] = heap[child]
+            pos[heap[i]] = i
+            i = child
+        heap[i] = var
+        pos[var] = i
+
+
+class Ordered(Heuristic):
+    """原 rule4 的策略：下标最小的未指派变元，指派为 0"""
+    name = 'ordered'
+
+    def __init__(self, nvars: int, save_phase: bool = False):
+        super().__init__(nvars, save_phase)
+        self.score = [self.initial(v) for v in range(nvars)]
+
+    def initial(self, var: int):
+        return -float(var)
+
+
+class VSIDS(Heuristic):
+    """变元活跃度启发式：参与冲突的变元活跃度增加，所有活跃度按 decay 指数衰减"""
+    name = 'vsids'
+
+    def __init__(self, nvars: int, save_phase: bool = True, decay: float = 0.95):
+        super().__init__(nvars, save_phase)
+        self.var_decay = decay
+        self.inc = 1.0
+
+    def bump(self, var: int):
+        score = self.score
+        score[var] += self.inc
+        if score[var] > 1e100:
+            for v in range(self.nvars):
+                score[v] *= 1e-100
+            self.inc *= 1e-100
+        if self.pos[var] >= 0:
+            self.up(self.pos[var])
+
+    def decay(self):
+        self.inc /= self.var_decay
+
+
+class JeroslowWang(Heuristic):
+    """双边 Jeroslow-Wang：J(l) = sum(2^-|C|)，取 J(x)+J(~x) 最大的变元，相位取 J 较大的一侧"""
+    name = 'jw'
+
+    def init(self, clauses: Iterable[Iterable[int]]):
+        pos = [0.0] * self.nvars
+        neg = [0.0] * self.nvars
+        for clause in clauses:
+            clause = list(clause)
+            w = 2.0 ** -len(clause)
+            for lit in clause:
+                if lit > 0:
+                    pos[lit - 1] += w
+                else:
+                    neg[-lit - 1] += w
+        for v in range(self.nvars):
+            self.score[v] = pos[v] + neg[v]
+            self.phase[v] = pos[v] > neg[v]
+        super().init(clauses)
+
+
+class MOMS(Heuristic):
+    """MOMS：在最短子句中出现次数最多的变元，score = (f(x)+f(~x))*2^k + f(x)*f(~x)"""
+    name = 'moms'
+
+    def __init__(self, nvars: int, save_phase: bool = True, k: int = 10):
+        super().__init__(nvars, save_phase)
+        self.k = k
+
+    def init(self, clauses: Iterable[Iterable[int]]):
+        clauses = [list(clause) for clause in clauses]
+        shortest = min((len(c) for c in clauses if len(c) > 1), default=0)
+        pos = [0] * self.nvars
+        neg = [0] * self.nvars
+        for clause in clauses:
+            if len(clause) != shortest:
+                continue
+            for lit in clause:
+                if lit > 0:
+                    pos[lit - 1] += 1
+                else:
+                    neg[-lit - 1] += 1
+        for v in range(self.nvars):
+            self.score[v] = (pos[v] + neg[v]) * 2 ** self.k + pos[v] * neg[v]
+            self.phase[v] = pos[v] > neg[v]
+        super().init(clauses)
+
+
+HEURISTICS = {h.name: h for h in [Ordered, VSIDS, JeroslowWang, MOMS]}
+
+
+if __name__ == "__main__":
+    import io
+    import sys
+    import time
+    from contextlib import redirect_stdout
+    from DPLL import CNFParser, CDCL
+
+    cnfs = CNFParser(sys.argv[1] if len(sys.argv) > 1 else "./cnfs")
+    for name in HEURISTICS:
+        total = 0
+        for i in range(len(cnfs)):
+            with redirect_stdout(io.StringIO()):
+                forms, vars = cnfs[i]
+            solver = CDCL(forms, vars, heuristic=name)
+            s = time.time()
+            solver.solve()
+            total += time.time() - s
+        print(f"{name:8s} solved {len(cnfs)} files in {1e3*total:.4f}ms")
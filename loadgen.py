@@ -0,0 +1,76 @@
+import asyncio
+import random
+import statistics
+import time
+from typing import Dict, List
+from bench import random_ksat
+from server import request
+import batch
+import dimacs
+
+
+def payloads(files: List[str], count: int, n: int, ratio: float, seed: int, binary: bool) -> List[bytes]:
+    """请求体：给出文件时轮流使用这些文件，否则生成 count 个随机 3-SAT 实例"""
+    dbs = [dimacs.parse(file)[0] for file in files]
+    if not dbs:
+        rng = random.Random(seed)
+        dbs = [random_ksat(n, round(n * ratio), 3, rng) for _ in range(count)]
+    if binary:
+        return [db.tobytes() for db in dbs]
+    return [(f"p cnf {db.nvars} {len(db)}\n" + "".join(" ".join(map(str, c)) + " 0\n" for c in db.clauses())).encode()
+            for db in dbs]
+
+
+async def run(bodies: List[bytes], requests: int, concurrency: int, binary: bool = False, **params) -> Dict:
+    """以 concurrency 个并发客户端发送 requests 个请求，返回吞吐量与延迟分布"""
+    latencies: List[float] = []
+    results: Dict[str, int] = {}
+    counter = iter(range(requests))
+
+    async def client():
+        for i in counter:
+            s = time.perf_counter()
+            try:
+                record = await request(bodies[i % len(bodies)], binary=binary, model=0, **params)
+                key = record.get("result") if record.get("status") == 200 else f"HTTP {record.get('status')}"
+            except OSError as e:
+                key = type(e).__name__
+            latencies.append(time.perf_counter() - s)
+            results[key] = results.get(key, 0) + 1
+
+    s = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - s
+    latencies.sort()
+    q = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return {"requests": len(latencies), "seconds": elapsed, "throughput": len(latencies) / elapsed,
+            "p50": q[49], "p95": q[94], "p99": q[98], "max": latencies[-1], "results": results}
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="concurrent load generator for server.py")
+    parser.add_argument("paths", nargs="*", help="CNF files or folders, random 3-SAT by default")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None)
+    parser.add_argument("-n", "--requests", type=int, default=200)
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("--vars", type=int, default=50, help="variables of the generated instances")
+    parser.add_argument("--ratio", type=float, default=4.26)
+    parser.add_argument("--instances", type=int, default=20, help="number of generated instances")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--binary", action="store_true", help="send ClauseDB bytes instead of DIMACS text")
+    parser.add_argument("--solver", default=None)
+    parser.add_argument("--timeout", type=float, default=None, help="seconds per request")
+    args = parser.parse_args()
+
+    bodies = payloads(list(batch.files(args.paths)), args.instances, args.vars, args.ratio, args.seed, args.binary)
+    report = asyncio.run(run(bodies, args.requests, args.concurrency, args.binary, host=args.host, port=args.port,
+                             unix=args.unix, solver=args.solver, timeout=args.timeout))
+    print(f"{report['requests']} requests in {report['seconds']:.2f}s, {report['throughput']:.1f} req/s")
+    print(f"latency p50 {1e3*report['p50']:.2f}ms p95 {1e3*report['p95']:.2f}ms p99 {1e3*report['p99']:.2f}ms "
+          f"max {1e3*report['max']:.2f}ms")
+    print(json.dumps(report["results"]))
@@ -0,0 +1,219 @@
+import random
+from array import array
+from itertools import accumulate
+from typing import Callable, List
+from clausedb import ClauseDB, toDimacs
+from formula import Formula
+from heuristic import Heuristic
+from search import Budget
+
+
+class LocalSearch:
+    """
+    随机局部搜索(WalkSAT / probSAT)，只能找到模型，不能证明不可满足。
+    子句与出现列表都是平坦数组：count[c] 为子句中为真的文字数，xor[c] 为为真文字的变元下标的异或，
+    count[c] == 1 时 xor[c] 就是唯一使其满足的变元。翻转变元时只访问它的两个出现列表，增量维护
+    breaks[v](翻转 v 后变为不满足的子句数)、makes[v](翻转 v 后变为满足的子句数)与不满足子句集合。
+    """
+
+    def __init__(self, db: ClauseDB, algorithm: str = "probsat", seed: int = None, noise: float = 0.567,
+                 cb: float = 2.38, eps: float = 1.0):
+        self.nvars = n = db.nvars
+        self.algorithm = algorithm
+        self.rng = random.Random(seed)
+        self.noise = noise
+        # probSAT 的多项式分布：选中概率正比于 (eps + break) ^ -cb
+        self.table = [(eps + b) ** -cb for b in range(64)]
+        self.cb, self.eps = cb, eps
+        # 重言子句永远满足，不参与搜索
+        self.lits = array('i')
+        self.offsets = array('q', [0])
+        self.empty = False
+        for clause in db:
+            if any(lit ^ 1 in clause for lit in clause):
+                continue
+            self.empty |= not len(clause)
+            self.lits.extend(clause)
+            self.offsets.append(len(self.lits))
+        m = len(self.offsets) - 1
+        counts = [0] * (2 * n + 1)
+        for lit in self.lits:
+            counts[lit + 1] += 1
+        self.occ_offsets = array('q', accumulate(counts))
+        self.occ = array('i', bytes(4 * len(self.lits)))
+        fill = array('q', self.occ_offsets)
+        for c in range(m):
+            for k in range(self.offsets[c], self.offsets[c + 1]):
+                lit = self.lits[k]
+                self.occ[fill[lit]] = c
+                fill[lit] += 1
+        self.value = bytearray(n)
+        self.count = array('i', bytes(4 * m))
+        self.xor = array('i', bytes(4 * m))
+        self.breaks = array('i', bytes(4 * n))
+        self.makes = array('i', bytes(4 * n))
+        # 不满足的子句及其在 unsat 中的位置
+        self.unsat: List[int] = []
+        self.where = array('i', [-1]) * m
+        self.best = bytearray(n)
+        self.best_unsat = m + 1
+        self.flips = 0
+
+    def reset(self, phase: List[bool] = None):
+        """从给定相位(默认随机)开始，重新计算全部计数"""
+        n = self.nvars
+        rng = self.rng
+        self.value = bytearray(bool(phase[v]) if phase is not None else rng.random() < 0.5 for v in range(n))
+        lits, offsets, value = self.lits, self.offsets, self.value
+        count, xor, breaks, makes, where = self.count, self.xor, self.breaks, self.makes, self.where
+        for v in range(n):
+            breaks[v] = makes[v] = 0
+        self.unsat = []
+        for c in range(len(offsets) - 1):
+            cnt = x = 0
+            for k in range(offsets[c], offsets[c + 1]):
+                lit = lits[k]
+                if value[lit >> 1] != lit & 1:
+                    cnt += 1
+                    x ^= lit >> 1
+            count[c], xor[c] = cnt, x
+            where[c] = -1
+            if cnt == 1:
+                breaks[x] += 1
+            elif cnt == 0:
+                where[c] = len(self.unsat)
+                self.unsat.append(c)
+                for k in range(offsets[c], offsets[c + 1]):
+                    makes[lits[k] >> 1] += 1
+        self.remember()
+
+    def remember(self):
+        if len(self.unsat) < self.best_unsat:
+            self.best_unsat = len(self.unsat)
+            self.best[:] = self.value
+
+    def flip(self, v: int):
+        lits, offsets, occ, occ_offsets = self.lits, self.offsets, self.occ, self.occ_offsets
+        count, xor, breaks, makes = self.count, self.xor, self.breaks, self.makes
+        unsat, where = self.unsat, self.where
+        self.value[v] ^= 1
+        self.flips += 1
+        true_lit = 2 * v + (not self.value[v])
+        for i in range(occ_offsets[true_lit], occ_offsets[true_lit + 1]):
+            c = occ[i]
+            cnt = count[c] + 1
+            count[c] = cnt
+            x = xor[c] ^ v
+            xor[c] = x
+            if cnt == 1:
+                # 不满足 -> 满足，v 成为唯一使其满足的变元
+                last = unsat.pop()
+                if last != c:
+                    unsat[where[c]] = last
+                    where[last] = where[c]
+                where[c] = -1
+                breaks[v] += 1
+                for k in range(offsets[c], offsets[c + 1]):
+                    makes[lits[k] >> 1] -= 1
+            elif cnt == 2:
+                breaks[x ^ v] -= 1
+        false_lit = true_lit ^ 1
+        for i in range(occ_offsets[false_lit], occ_offsets[false_lit + 1]):
+            c = occ[i]
+            cnt = count[c] - 1
+            count[c] = cnt
+            x = xor[c] ^ v
+            xor[c] = x
+            if cnt == 0:
+                where[c] = len(unsat)
+                unsat.append(c)
+                breaks[v] -= 1
+                for k in range(offsets[c], offsets[c + 1]):
+                    makes[lits[k] >> 1] += 1
+            elif cnt == 1:
+                breaks[x] += 1
+
+    def pick(self, c: int):
+        """在不满足的子句 c 中选择要翻转的变元"""
+        lits, breaks, rng = self.lits, self.breaks, self.rng
+        vars = [lits[k] >> 1 for k in range(self.offsets[c], self.offsets[c + 1])]
+        if self.algorithm == "walksat":
+            scores = [breaks[v] for v in vars]
+            least = min(scores)
+            if least > 0 and rng.random() < self.noise:
+                return rng.choice(vars)
+            return rng.choice([v for v, b in zip(vars, scores) if b == least])
+        table = self.table
+        weights = [table[breaks[v]] if breaks[v] < 64 else (self.eps + breaks[v]) ** -self.cb for v in vars]
+        r = rng.random() * sum(weights)
+        for v, w in zip(vars, weights):
+            r -= w
+            if r <= 0:
+                return v
+        return vars[-1]
+
+    def solve(self, max_flips: int = None, tries: int = 1, phase: List[bool] = None, timeout: float = None,
+              interrupt: Callable[[], bool] = None):
+        """
+        最多 tries 轮、每轮最多 max_flips 次翻转，找到模型返回 True，存在空子句时返回 False，否则返回 None(UNKNOWN)。
+        第一轮从 phase 开始，之后每轮随机重新开始。
+        """
+        if self.empty:
+            return False
+        budget = Budget(self, timeout=timeout, interrupt=interrupt)
+        rng = self.rng
+        for t in range(tries):
+            self.reset(phase if t == 0 else None)
+            flips = 0
+            while self.unsat:
+                if max_flips is not None and flips >= max_flips:
+                    break
+                if not flips & 1023 and budget.exceeded(self):
+                    return None
+                unsat = self.unsat
+                self.flip(self.pick(unsat[rng.randrange(len(unsat))]))
+                flips += 1
+                if len(self.unsat) < self.best_unsat:
+                    self.remember()
+            else:
+                return True
+        return None
+
+    def model(self):
+        """当前指派的 DIMACS 模型，与 Solver.model() 的格式相同"""
+        return [toDimacs(2 * v + (not self.value[v])) for v in range(self.nvars)]
+
+    def assign(self, vars: List[Formula]):
+        """把当前指派写入公式图的原子，之后可以用 compute_result_on_cnf 验证"""
+        for v, var in enumerate(vars):
+            var.set(self.value[v])
+
+    def phases(self, heuristic: Heuristic):
+        """把搜索过程中不满足子句最少的指派作为分支启发式的初始相位"""
+        for v in range(min(self.nvars, heuristic.nvars)):
+            heuristic.phase[v] = bool(self.best[v])
+
+
+if __name__ == "__main__":
+    import io
+    import sys
+    import time
+    from contextlib import redirect_stdout
+    from DPLL import CNFParser, compute_result_on_cnf
+
+    cnfs = CNFParser(sys.argv[1] if len(sys.argv) > 1 else "./randn_cnfs")
+    for algorithm in ["probsat", "walksat"]:
+        total = 0
+        solved = 0
+        for i in range(len(cnfs)):
+            with redirect_stdout(io.StringIO()):
+                db = cnfs.load(i)
+            s = time.time()
+            search = LocalSearch(db, algorithm, seed=0)
+            ret = search.solve(max_flips=1000000)
+            total += time.time() - s
+            if ret:
+                forms, vars = db.toFormulas()
+                search.assign(vars)
+                solved += bool(compute_result_on_cnf(forms))
+        print(f"{algorithm:8s} solved {solved}/{len(cnfs)} files in {1e3*total:.4f}ms")
@@ -0,0 +1,117 @@
+import resource
+import sys
+from typing import Dict
+
+# 估计时使用的对象大小(CPython 64 位)
+POINTER = 8
+LIST = sys.getsizeof([])
+# 字典中一项：哈希表槽位与键值对象
+ENTRY = 3 * POINTER + 2 * 32
+
+
+def rss() -> int:
+    """进程生存期内的峰值常驻内存(字节)，Linux 上 ru_maxrss 以 KB 为单位"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Memory:
+    """
+    求解器的内存预算：按元素个数估计子句库、出现索引、监视列表与学习子句占用的字节数，并记录峰值。
+    图的静态部分(Formula 节点及其缓存)在 attach() 时遍历一次，之后每次 check() 只重新计算学习子句部分。
+    估计值超过 budget 时依次释放：
+    1. 可以重建的缓存：Formula.forms(getFormulas 的结果)与子句节点的 sid 字符串(__str__ 会重新生成)；
+    2. 学习子句：调用 reduceDB() 删除一半，并把学习子句上限降到当前数量，避免很快又长回来。
+    求解器每 memory_interval 次冲突调用一次 check()。
+    """
+
+    def __init__(self, budget: int = None):
+        self.budget = budget
+        self.parts: Dict[str, int] = {}
+        self.static: Dict[str, int] = {}
+        self.current = self.peak = 0
+        # 释放缓存与缩减学习子句的次数
+        self.shed_caches = self.shed_learnts = 0
+
+    def attach(self, solver):
+        """让求解器在搜索中检查预算，返回求解器"""
+        solver.memory = self
+        self.static = self.graph(solver) if hasattr(solver, "forms") else {}
+        self.check(solver)
+        return solver
+
+    @staticmethod
+    def nodes(solver):
+        """图中的全部节点：子句、变元及其否定"""
+        yield from solver.forms
+        for var in solver.vars:
+            yield var
+            if var.invert is not None:
+                yield var.invert
+
+    def graph(self, solver) -> Dict[str, int]:
+        """Formula 图的静态部分：节点与边、缓存、出现索引"""
+        nodes = caches = 0
+        for node in self.nodes(solver):
+            nodes += sys.getsizeof(node) + sys.getsizeof(node.prev_nodes) + sys.getsizeof(node.next_nodes) \
+                + sys.getsizeof(node.watches) + sys.getsizeof(node.atoms)
+            if node.forms is not None:
+                caches += sys.getsizeof(node.forms)
+            # 变元的名字用于输出，只有子句的 sid 可以释放
+            if node.sid is not None:
+                if node.prev_nodes:
+                    caches += sys.getsizeof(node.sid)
+                else:
+                    nodes += sys.getsizeof(node.sid)
+        occ = solver.occ
+        occurrences = occ.offsets.itemsize * len(occ.offsets) + occ.clauses.itemsize * len(occ.clauses) \
+            + sum(ENTRY + sys.getsizeof(forms) for forms in occ.extra.values())
+        return {"formulas": nodes, "caches": caches, "occurrences": occurrences}
+
+    def estimate(self, solver) -> Dict[str, int]:
+        """各部分的估计字节数"""
+        parts = dict(self.static)
+        learnts = getattr(solver, "learnts", ())
+        if hasattr(solver, "db"):
+            db = solver.db
+            offsets, size = db.offsets, db.lits.itemsize
+            lits = sum(offsets[c + 1] - offsets[c] for c in learnts)
+            n = len(solver.level)
+            parts["learnts"] = lits * size + len(learnts) * (offsets.itemsize + POINTER + ENTRY)
+            parts["clauses"] = db.nbytes - lits * size - len(learnts) * offsets.itemsize
+            parts["watches"] = 2 * n * LIST + 2 * len(db) * POINTER
+            parts["assignment"] = n * (7 * POINTER + 1) + len(solver.trail) * POINTER
+        elif hasattr(solver, "learnts"):
+            # 学习子句是不在 forms 中的 Formula 节点：节点、四个列表、sid、活跃度，以及文字的 next_nodes 与两个监视中的引用
+            parts["learnts"] = sum(sys.getsizeof(form) + 4 * LIST + sys.getsizeof(form.sid or "") + ENTRY
+                                   + 2 * POINTER + 2 * len(form.prev_nodes) * POINTER for form in learnts)
+        return parts
+
+    def check(self, solver):
+        """更新估计值与峰值，超过预算时释放缓存与学习子句，返回是否在预算之内"""
+        self.parts = self.estimate(solver)
+        self.current = sum(self.parts.values())
+        self.peak = max(self.peak, self.current)
+        if self.budget is None or self.current <= self.budget:
+            return True
+        if self.static.get("caches"):
+            self.shed_caches += 1
+            for node in self.nodes(solver):
+                node.forms = None
+                if node.prev_nodes:
+                    node.sid = None
+            for form in getattr(solver, "learnts", ()):
+                form.sid = None
+            self.static = self.graph(solver)
+        elif getattr(solver, "learnts", None):
+            self.shed_learnts += 1
+            solver.reduceDB()
+            solver.max_learnts = max(len(solver.learnts), 100)
+        else:
+            return False
+        self.parts = self.estimate(solver)
+        self.current = sum(self.parts.values())
+        return self.current <= self.budget
+
+    def toDict(self):
+        return {"estimated": self.current, "peak": self.peak, "budget": self.budget, "parts": dict(self.parts),
+                "shed_caches": self.shed_caches, "shed_learnts": self.shed_learnts}
@@ -0,0 +1,146 @@
+import multiprocessing as mp
+import os
+import queue
+import time
+from typing import Dict, List, Union
+from clausedb import ClauseDB
+from solver import Solver
+import cache
+
+# 每个求解器在共享内存中的学习子句环形缓冲区大小(整数个数)
+CAPACITY = 1 << 16
+
+
+def configs(n: int):
+    """n 个不同的求解器配置：轮流使用各个分支启发式与重启策略，随机种子各不相同"""
+    names = ["vsids", "jw", "moms", "vsids"]
+    restarts = ["luby", "glucose", "geometric"]
+    return [{"heuristic": names[i % len(names)], "restart": restarts[i % len(restarts)], "seed": i if i else None}
+            for i in range(n)]
+
+
+class Exchange:
+    """
+    学习子句的共享内存交换区：每个求解器只写自己的环形缓冲区，子句以 [长度, 文字...] 的形式写入，
+    写完后才更新 heads 中的写入位置；读取方记录对每个缓冲区的读取位置，被覆盖的部分直接丢弃。
+    正在写入的子句还没有反映在 heads 中，最多占 size+1 个位置，因此读取的区间与写入位置之间至少留出这么多。
+    """
+
+    def __init__(self, workers: int, ctx, capacity: int = CAPACITY):
+        self.workers = workers
+        self.capacity = capacity
+        self.ring = ctx.RawArray("i", workers * capacity)
+        self.heads = ctx.RawArray("q", workers)
+
+    def attach(self, index: int, solver: Solver, size: int):
+        """让求解器导出长度不超过size的学习子句，并导入其他求解器的子句"""
+        ring, heads, capacity = self.ring, self.heads, self.capacity
+        base = index * capacity
+        cursors = [0] * self.workers
+        # 可以安全读取的最大积压：留出一个正在写入的子句
+        margin = capacity - (size + 1)
+
+        def export(lits: List[int]):
+            if len(lits) > size:
+                return
+            head = heads[index]
+            for i, x in enumerate([len(lits)] + lits):
+                ring[base + (head + i) % capacity] = x
+            heads[index] = head + len(lits) + 1
+
+        def imports():
+            clauses = []
+            for other in range(self.workers):
+                if other == index:
+                    continue
+                start = other * capacity
+                head = heads[other]
+                cursor = cursors[other]
+                if head - cursor > margin:
+                    cursor = head
+                data = [ring[start + i % capacity] for i in range(cursor, head)]
+                # 读取期间被覆盖，或可能被正在写入的子句覆盖，则丢弃这一批
+                if heads[other] - cursor <= margin:
+                    i = 0
+                    while i < len(data):
+                        clauses.append(data[i + 1:i + 1 + data[i]])
+                        i += data[i] + 1
+                cursors[other] = head
+            return clauses
+
+        solver.export = export
+        solver.imports = imports
+
+
+def _load(source: Union[ClauseDB, os.PathLike]):
+    return source if isinstance(source, ClauseDB) else cache.load(source)[0]
+
+
+def _worker(index: int, source, config: Dict, results, exchange: Exchange, size: int):
+    try:
+        solver = Solver(_load(source), **config)
+        if exchange is not None:
+            exchange.attach(index, solver, size)
+        result = solver.solve()
+        results.put((index, result, solver.model() if result else None))
+    except Exception as e:
+        results.put((index, None, repr(e)))
+
+
+def solve(source: Union[ClauseDB, os.PathLike], workers: int = None, config: List[Dict] = None,
+          share: int = 3, timeout: float = None):
+    """
+    在多个进程中以不同配置求解同一实例，返回最先得到的结果 (result, model, config)，其余进程随即终止。
+    source 为 ClauseDB 或 CNF 文件路径(各进程通过 cache.load 读取)，share 为共享学习子句的最大长度(0 表示不共享)，
+    超时或全部失败时 result 为 None。
+    """
+    workers = workers or os.cpu_count()
+    config = config or configs(workers)
+    workers = len(config)
+    if not isinstance(source, ClauseDB):
+        # 预先写入缓存，各进程直接内存映射读取
+        cache.load(source)
+    ctx = mp.get_context()
+    results = ctx.Queue()
+    exchange = Exchange(workers, ctx) if share > 0 and workers > 1 else None
+    procs = [ctx.Process(target=_worker, args=(i, source, config[i], results, exchange, share), daemon=True)
+             for i in range(workers)]
+    for proc in procs:
+        proc.start()
+    answer = (None, None, None)
+    deadline = None if timeout is None else time.time() + timeout
+    try:
+        for _ in range(workers):
+            left = None if deadline is None else max(deadline - time.time(), 0)
+            index, result, model = results.get(timeout=left)
+            if result is not None:
+                answer = (result, model, config[index])
+                break
+    except queue.Empty:
+        pass
+    finally:
+        for proc in procs:
+            if proc.is_alive():
+                proc.terminate()
+        for proc in procs:
+            proc.join()
+    return answer
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="portfolio solving of one CNF file")
+    parser.add_argument("cnf")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--share", type=int, default=3, help="max length of shared learned clauses, 0 to disable")
+    parser.add_argument("--timeout", type=float, default=None)
+    args = parser.parse_args()
+
+    s = time.time()
+    result, model, config = solve(args.cnf, args.workers, share=args.share, timeout=args.timeout)
+    print("SAT result :", "UNKNOWN" if result is None else result)
+    print("winner :", config)
+    print(f"solved in {1e3*(time.time()-s):.4f}ms")
+    if model:
+        print("v", " ".join(map(str, model)), "0")
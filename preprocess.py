@@ -0,0 +1,266 @@
+from typing import Iterable, List, Set
+from clausedb import ClauseDB, toDimacs, toLit
+from proof import Proof
+
+
+class Preprocessor:
+    """
+    求解前的化简：顶层单元传播、基于出现列表的子句包含与自包含消解(strengthening)、
+    有界变元消去(BVE)与失败文字探测。化简后的子句库保持原来的变元编号，
+    extend() 利用消去变元时保存的子句把化简公式的模型还原为原公式的模型。
+    给出 proof 时记录每个推出的子句(单元、删去文字后的子句、消解式)与删除的子句，
+    之后求解器在同一个证明中继续记录，整个证明对原公式成立。
+    """
+
+    def __init__(self, db: ClauseDB, frozen: Iterable[int] = (), grow: int = 0, occ_limit: int = 10,
+                 clause_limit: int = 20, probe_budget: int = 100000, proof: Proof = None):
+        self.nvars = db.nvars
+        # 子句为文字集合，被删除的子句为 None
+        self.clauses: List[Set[int]] = []
+        # occ[lit] 为包含 lit 的子句下标
+        self.occ: List[Set[int]] = [set() for i in range(2 * db.nvars)]
+        # 以文字为下标：1 为真，0 为假，-1 为未指派
+        self.value = [-1] * (2 * db.nvars)
+        self.units: List[int] = []
+        # 消去变元时删除的子句，(主元文字, 子句)
+        self.stack = []
+        # 不参与消去的变元(从 0 开始)，例如增量求解中的假设变元
+        self.frozen = set(frozen)
+        self.grow = grow
+        self.occ_limit = occ_limit
+        self.clause_limit = clause_limit
+        self.probe_budget = probe_budget
+        # 化简统计
+        self.subsumed = self.strengthened = self.eliminated = self.failed = 0
+        self.proof = proof
+        self.ok = True
+        for clause in db:
+            self.add(clause)
+
+    def add(self, lits: Iterable[int], derived: bool = False):
+        """加入子句：去掉为假的文字，忽略已满足和重言的子句，单元子句加入传播队列。derived 为推出的子句"""
+        lits = list(lits)
+        clause = set()
+        for lit in lits:
+            if self.value[lit] == 1 or lit ^ 1 in clause:
+                return
+            if self.value[lit] < 0:
+                clause.add(lit)
+        if not clause:
+            self.fail()
+        elif len(clause) == 1:
+            self.assign(next(iter(clause)))
+        else:
+            if self.proof is not None and (derived or len(clause) < len(lits)):
+                self.proof.addLits(clause)
+            c = len(self.clauses)
+            self.clauses.append(clause)
+            for lit in clause:
+                self.occ[lit].add(c)
+            return c
+
+    def remove(self, c: int):
+        # 单元子句已作为指派记录在证明中，不删除
+        if self.proof is not None and len(self.clauses[c]) > 1:
+            self.proof.deleteLits(self.clauses[c])
+        for lit in self.clauses[c]:
+            self.occ[lit].discard(c)
+        self.clauses[c] = None
+
+    def strengthen(self, c: int, lit: int):
+        """从子句中删去文字，剩下一个文字时转为单元"""
+        clause = self.clauses[c]
+        old = list(clause)
+        clause.discard(lit)
+        self.occ[lit].discard(c)
+        if len(clause) == 1:
+            unit = next(iter(clause))
+            self.remove(c)
+            self.assign(unit)
+        elif self.proof is not None:
+            self.proof.addLits(clause)
+        # 先记录新的子句，再删除原来的子句
+        if self.proof is not None:
+            self.proof.deleteLits(old)
+
+    def assign(self, lit: int):
+        if self.value[lit] == 0:
+            self.fail()
+        elif self.value[lit] < 0:
+            self.value[lit] = 1
+            self.value[lit ^ 1] = 0
+            self.units.append(lit)
+            if self.proof is not None:
+                self.proof.addLits([lit])
+
+    def fail(self):
+        """得到空子句，推出它的子句此时都还未删除，立即记录到证明中"""
+        if self.ok and self.proof is not None:
+            self.proof.add(())
+        self.ok = False
+
+    def propagate(self):
+        """顶层单元传播：删除被满足的子句，从子句中删去为假的文字"""
+        while self.units and self.ok:
+            lit = self.units.pop()
+            for c in list(self.occ[lit]):
+                self.remove(c)
+            for c in list(self.occ[lit ^ 1]):
+                if self.clauses[c] is not None:
+                    self.strengthen(c, lit ^ 1)
+        return self.ok
+
+    def subsume(self, queue: Iterable[int] = None):
+        """反向包含检查：删除被包含的子句，并用自包含消解删去文字"""
+        queue = list(range(len(self.clauses)) if queue is None else queue)
+        while queue and self.ok:
+            c = queue.pop()
+            clause = self.clauses[c]
+            if clause is None:
+                continue
+            # 只需检查出现次数最少的变元的两个出现列表
+            best = min(clause, key=lambda l: len(self.occ[l]) + len(self.occ[l ^ 1]))
+            for d in list(self.occ[best] | self.occ[best ^ 1]):
+                other = self.clauses[d]
+                if d == c or other is None or len(other) < len(clause):
+                    continue
+                flipped = None
+                for lit in clause:
+                    if lit in other:
+                        continue
+                    if flipped is None and lit ^ 1 in other:
+                        flipped = lit ^ 1
+                    else:
+                        break
+                else:
+                    if flipped is None:
+                        self.remove(d)
+                        self.subsumed += 1
+                    else:
+                        self.strengthen(d, flipped)
+                        self.strengthened += 1
+                        if self.clauses[d] is not None:
+                            queue.append(d)
+                if self.clauses[c] is None:
+                    break
+            if not self.propagate():
+                return False
+        return self.ok
+
+    def resolvents(self, var: int):
+        """变元的所有非重言消解式，超过子句数或长度限制时返回 None"""
+        pos, neg = self.occ[2 * var], self.occ[2 * var + 1]
+        limit = len(pos) + len(neg) + self.grow
+        result = []
+        for c in pos:
+            for d in neg:
+                resolvent = (self.clauses[c] | self.clauses[d]) - {2 * var, 2 * var + 1}
+                if any(lit ^ 1 in resolvent for lit in resolvent):
+                    continue
+                if len(resolvent) > self.clause_limit or len(result) >= limit:
+                    return None
+                result.append(resolvent)
+        return result
+
+    def eliminate(self):
+        """有界变元消去：消解式不多于原子句时用消解式替换变元的全部子句"""
+        order = sorted(range(self.nvars), key=lambda v: len(self.occ[2 * v]) + len(self.occ[2 * v + 1]))
+        for var in order:
+            pos, neg = self.occ[2 * var], self.occ[2 * var + 1]
+            if var in self.frozen or self.value[2 * var] >= 0 or not (pos or neg):
+                continue
+            if len(pos) > self.occ_limit and len(neg) > self.occ_limit:
+                continue
+            resolvents = self.resolvents(var)
+            if resolvents is None:
+                continue
+            # 消解式不含该变元，先加入消解式，证明中的消解式由仍存在的原子句推出
+            added = [self.add(resolvent, True) for resolvent in resolvents]
+            for lit in (2 * var, 2 * var + 1):
+                for c in list(self.occ[lit]):
+                    self.stack.append((lit, self.clauses[c]))
+                    self.remove(c)
+            self.eliminated += 1
+            if not self.propagate() or not self.subsume(c for c in added if c is not None):
+                return False
+        return self.ok
+
+    def probe(self):
+        """失败文字探测：对出现在二元子句中的文字试探传播，导致冲突的文字取反作为单元"""
+        budget = self.probe_budget
+        for lit in range(2 * self.nvars):
+            if budget <= 0 or not self.ok:
+                break
+            if self.value[lit] >= 0 or not any(len(self.clauses[c]) == 2 for c in self.occ[lit ^ 1]):
+                continue
+            conflict, visited = self.tryLit(lit, budget)
+            budget -= visited
+            if conflict:
+                self.failed += 1
+                self.assign(lit ^ 1)
+                self.propagate()
+        return self.ok
+
+    def tryLit(self, lit: int, budget: int):
+        """在当前子句集上假设 lit 为真并做单元传播，返回 (是否冲突, 访问的子句数)"""
+        true = {lit}
+        queue = [lit]
+        visited = 0
+        while queue and visited < budget:
+            for c in self.occ[queue.pop() ^ 1]:
+                visited += 1
+                unit, count = None, 0
+                for x in self.clauses[c]:
+                    if x in true:
+                        break
+                    if x ^ 1 not in true:
+                        unit, count = x, count + 1
+                else:
+                    if count == 0:
+                        return True, visited
+                    if count == 1:
+                        true.add(unit)
+                        queue.append(unit)
+        return False, visited
+
+    def run(self, subsume: bool = True, eliminate: bool = True, probe: bool = True):
+        """依次执行各项化简，返回公式是否仍可能满足"""
+        if self.propagate() and probe:
+            self.probe()
+        if self.ok and subsume:
+            self.subsume()
+        if self.ok and eliminate:
+            self.eliminate()
+        return self.ok
+
+    def result(self):
+        """化简后的子句库，已确定的变元以单元子句给出"""
+        db = ClauseDB(self.nvars)
+        for lit in range(0, 2 * self.nvars):
+            if self.value[lit] == 1:
+                db.addLits([lit])
+        for clause in self.clauses:
+            if clause is not None:
+                db.addLits(sorted(clause))
+        return db
+
+    def extend(self, model: List[int]):
+        """把化简公式的 DIMACS 模型还原为原公式的模型"""
+        value = [1, 0] * self.nvars
+        for d in model:
+            lit = toLit(d)
+            value[lit], value[lit ^ 1] = 1, 0
+        for lit in range(2 * self.nvars):
+            if self.value[lit] == 1:
+                value[lit], value[lit ^ 1] = 1, 0
+        # 逆序检查消去时保存的子句，不满足时翻转主元
+        for pivot, clause in reversed(self.stack):
+            if not any(value[lit] == 1 for lit in clause):
+                value[pivot], value[pivot ^ 1] = 1, 0
+        return [toDimacs(2 * v + (value[2 * v] == 0)) for v in range(self.nvars)]
+
+
+def simplify(db: ClauseDB, **kwargs):
+    """化简子句库，返回 (化简后的子句库, Preprocessor)，公式不可满足时子句库为 None"""
+    pre = Preprocessor(db, **kwargs)
+    return (pre.result() if pre.run() else None), pre
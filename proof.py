@@ -0,0 +1,224 @@
+import os
+from typing import BinaryIO, Dict, Iterable, List, Tuple, Union
+from clausedb import toDimacs
+
+
+class Proof:
+    """
+    DRAT 证明的流式输出：子句以 DIMACS 整数给出(addLits/deleteLits 接受 ClauseDB 的文字编码)，
+    写入内存缓冲区，超过 buffer 字节时才写到文件或管道。binary 时使用二进制 DRAT：
+    'a'/'d' 后跟每个文字的变长编码 2*|l| + (l < 0)，以 0 结束。
+    """
+
+    def __init__(self, file: Union[os.PathLike, BinaryIO], binary: bool = False, buffer: int = 1 << 16):
+        self.own = not hasattr(file, "write")
+        self.file = open(file, "wb") if self.own else file
+        self.binary = binary
+        self.buffer = buffer
+        self.data = bytearray()
+        self.added = self.deleted = 0
+
+    def add(self, clause: Iterable[int]):
+        self.added += 1
+        self.write(b"a" if self.binary else b"", clause)
+
+    def delete(self, clause: Iterable[int]):
+        self.deleted += 1
+        self.write(b"d" if self.binary else b"d ", clause)
+
+    def addLits(self, lits: Iterable[int]):
+        self.add(map(toDimacs, lits))
+
+    def deleteLits(self, lits: Iterable[int]):
+        self.delete(map(toDimacs, lits))
+
+    def write(self, tag: bytes, clause: Iterable[int]):
+        data = self.data
+        data += tag
+        if self.binary:
+            for d in clause:
+                code = 2 * d if d > 0 else -2 * d + 1
+                while code > 127:
+                    data.append(code & 127 | 128)
+                    code >>= 7
+                data.append(code)
+            data.append(0)
+        else:
+            data += " ".join([*map(str, clause), "0\n"]).encode()
+        if len(data) >= self.buffer:
+            self.flush()
+
+    def flush(self):
+        self.file.write(self.data)
+        self.data.clear()
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        if self.own:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def read(file: os.PathLike, binary: bool = None) -> List[Tuple[bool, List[int]]]:
+    """读取 DRAT 证明，返回 (是否为删除, 子句) 的列表；binary 为 None 时根据内容判断格式"""
+    with open(file, "rb") as f:
+        data = f.read()
+    if binary is None:
+        binary = any(b not in b"0123456789 -d\n\r\tc" for b in data[:64])
+    steps = []
+    if binary:
+        i, n = 0, len(data)
+        while i < n:
+            delete = data[i] == ord("d")
+            i += 1
+            clause = []
+            while True:
+                code, shift = 0, 0
+                while data[i] & 128:
+                    code |= (data[i] & 127) << shift
+                    shift += 7
+                    i += 1
+                code |= data[i] << shift
+                i += 1
+                if not code:
+                    break
+                clause.append(code >> 1 if not code & 1 else -(code >> 1))
+            steps.append((delete, clause))
+        return steps
+    for line in data.decode().splitlines():
+        tokens = line.split()
+        if not tokens or tokens[0] == "c":
+            continue
+        delete = tokens[0] == "d"
+        clause = [int(t) for t in tokens[delete:]]
+        steps.append((delete, clause[:-1] if clause and clause[-1] == 0 else clause))
+    return steps
+
+
+class Checker:
+    """
+    前向检查 DRAT 证明，用于测试：每个加入的子句必须是 RUP(否定其全部文字后单元传播得到冲突)，
+    否则必须对首个文字是 RAT。单元传播使用两个监视文字，每次检查后撤销全部指派。
+    """
+
+    def __init__(self, clauses: Iterable[Iterable[int]]):
+        self.clauses: List[List[int]] = []
+        self.alive: List[bool] = []
+        # 同一文字集合的子句下标，删除时使用
+        self.index: Dict[frozenset, List[int]] = {}
+        self.watches: Dict[int, List[int]] = {}
+        self.units: List[int] = []
+        self.empty = False
+        for clause in clauses:
+            self.add(list(clause))
+
+    def add(self, clause: List[int]):
+        clause = list(dict.fromkeys(clause))
+        c = len(self.clauses)
+        self.clauses.append(clause)
+        self.alive.append(True)
+        self.index.setdefault(frozenset(clause), []).append(c)
+        if not clause:
+            self.empty = True
+        elif len(clause) == 1:
+            self.units.append(c)
+        else:
+            self.watches.setdefault(clause[0], []).append(c)
+            self.watches.setdefault(clause[1], []).append(c)
+
+    def delete(self, clause: List[int]):
+        found = self.index.get(frozenset(clause))
+        if found:
+            self.alive[found.pop()] = False
+
+    def rup(self, clause: List[int]) -> bool:
+        """否定 clause 的全部文字后单元传播是否得到冲突"""
+        if self.empty:
+            return True
+        value: Dict[int, bool] = {}
+        trail = []
+
+        def assign(lit: int):
+            if value.get(abs(lit)) is None:
+                value[abs(lit)] = lit > 0
+                trail.append(lit)
+                return True
+            return value[abs(lit)] == (lit > 0)
+
+        for lit in clause:
+            if not assign(-lit):
+                return True
+        for c in self.units:
+            if self.alive[c] and not assign(self.clauses[c][0]):
+                return True
+        head = 0
+        while head < len(trail):
+            false = -trail[head]
+            head += 1
+            ws = self.watches.get(false, [])
+            i = 0
+            while i < len(ws):
+                c = ws[i]
+                lits = self.clauses[c]
+                if not self.alive[c]:
+                    i += 1
+                    continue
+                if lits[0] == false:
+                    lits[0], lits[1] = lits[1], lits[0]
+                if value.get(abs(lits[0])) == (lits[0] > 0):
+                    i += 1
+                    continue
+                for k in range(2, len(lits)):
+                    if value.get(abs(lits[k])) != (lits[k] < 0):
+                        lits[1], lits[k] = lits[k], lits[1]
+                        self.watches.setdefault(lits[1], []).append(c)
+                        ws[i] = ws[-1]
+                        ws.pop()
+                        break
+                else:
+                    if not assign(lits[0]):
+                        return True
+                    i += 1
+        return False
+
+    def rat(self, clause: List[int]) -> bool:
+        """对首个文字 p 是否为 RAT：与每个包含 ~p 的子句的消解式都是 RUP"""
+        if not clause:
+            return False
+        p = clause[0]
+        for c, other in enumerate(self.clauses):
+            if self.alive[c] and -p in other:
+                if not self.rup(clause + [lit for lit in other if lit != -p]):
+                    return False
+        return True
+
+    def check(self, steps: Iterable[Tuple[bool, List[int]]]) -> bool:
+        """依次检查证明步骤，推出空子句时返回 True，某一步既不是 RUP 也不是 RAT 或没有推出空子句时返回 False"""
+        for delete, clause in steps:
+            if delete:
+                self.delete(clause)
+                continue
+            if not self.rup(clause) and not self.rat(clause):
+                return False
+            if not clause:
+                return True
+            self.add(clause)
+        return self.empty
+
+
+def check(cnf: os.PathLike, proof: os.PathLike) -> bool:
+    """检查 DIMACS 文件的 DRAT 证明"""
+    import dimacs
+    return Checker(dimacs.parse(cnf)[0].clauses()).check(read(proof))
+
+
+if __name__ == "__main__":
+    import sys
+
+    print("VERIFIED" if check(sys.argv[1], sys.argv[2]) else "NOT VERIFIED")
@@ -0,0 +1,153 @@
+import time
+from collections import deque
+from typing import Callable
+
+
+def luby(i: int):
+    """Luby 序列 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ... 的第 i 项(从 0 开始)"""
+    size, seq = 1, 0
+    while size < i + 1:
+        seq += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        seq -= 1
+        i %= size
+    return 1 << seq
+
+
+class Restart(object):
+    """
+    重启策略：每次冲突后以学习子句的 LBD(包含的不同决策层数)与轨迹长度调用 conflict()，
+    返回 True 时求解器回到第 0 层重新决策(学习子句、变元活跃度与保存的相位都保留)，并调用 restart()。
+    """
+    name = ''
+
+    def conflict(self, lbd: int, trail: int):
+        return False
+
+    def restart(self):
+        pass
+
+
+class NoRestart(Restart):
+    name = 'none'
+
+
+class Luby(Restart):
+    """第 i 次重启前允许 unit * luby(i) 次冲突"""
+    name = 'luby'
+
+    def __init__(self, unit: int = 100):
+        self.unit = unit
+        self.index = 0
+        self.count = 0
+        self.limit = unit
+
+    def conflict(self, lbd: int, trail: int):
+        self.count += 1
+        return self.count >= self.limit
+
+    def restart(self):
+        self.index += 1
+        self.count = 0
+        self.limit = self.unit * luby(self.index)
+
+
+class Geometric(Restart):
+    """冲突次数限制从 first 开始，每次重启乘以 factor"""
+    name = 'geometric'
+
+    def __init__(self, first: int = 100, factor: float = 1.5):
+        self.count = 0
+        self.limit = first
+        self.factor = factor
+
+    def conflict(self, lbd: int, trail: int):
+        self.count += 1
+        return self.count >= self.limit
+
+    def restart(self):
+        self.count = 0
+        self.limit *= self.factor
+
+
+class Glucose(Restart):
+    """
+    glucose 的动态重启：最近 window 个学习子句的平均 LBD 乘以 k 超过全部学习子句的平均 LBD 时重启，
+    说明最近的冲突质量变差；轨迹长度明显超过最近的平均值(可能接近一个模型)时清空窗口以推迟重启。
+    """
+    name = 'glucose'
+
+    def __init__(self, window: int = 50, k: float = 0.8, block_window: int = 5000, block: float = 1.4,
+                 block_after: int = 10000):
+        self.window = window
+        self.k = k
+        self.block = block
+        self.block_after = block_after
+        self.lbds = deque(maxlen=window)
+        self.lbd_sum = 0
+        self.trails = deque(maxlen=block_window)
+        self.trail_sum = 0
+        self.total = 0
+        self.conflicts = 0
+
+    def conflict(self, lbd: int, trail: int):
+        self.conflicts += 1
+        self.total += lbd
+        trails = self.trails
+        if len(trails) == trails.maxlen:
+            self.trail_sum -= trails[0]
+            if self.conflicts > self.block_after and len(self.lbds) == self.window \
+                    and trail > self.block * self.trail_sum / len(trails):
+                self.restart()
+        trails.append(trail)
+        self.trail_sum += trail
+        lbds = self.lbds
+        if len(lbds) == self.window:
+            self.lbd_sum -= lbds[0]
+        lbds.append(lbd)
+        self.lbd_sum += lbd
+        return len(lbds) == self.window and self.lbd_sum / self.window * self.k > self.total / self.conflicts
+
+    def restart(self):
+        self.lbds.clear()
+        self.lbd_sum = 0
+
+
+RESTARTS = {r.name: r for r in [NoRestart, Luby, Geometric, Glucose]}
+
+
+class Budget(object):
+    """
+    一次 solve() 的搜索限制：冲突次数、传播次数、秒数与协作式的中断回调，均相对于调用时刻计算。
+    求解器在每次冲突后调用 exceeded()，在决策路径上调用 poll()，超出任何一项时 solve() 返回 None(UNKNOWN)。
+    """
+
+    # 决策路径上每隔多少次决策检查一次
+    interval = 100
+
+    def __init__(self, solver, conflicts: int = None, propagations: int = None, timeout: float = None,
+                 interrupt: Callable[[], bool] = None):
+        self.conflicts = None if conflicts is None else solver.conflicts + conflicts
+        self.propagations = None if propagations is None else solver.propagations + propagations
+        self.deadline = None if timeout is None else time.time() + timeout
+        self.interrupt = interrupt
+
+    def exceeded(self, solver):
+        return (self.conflicts is not None and solver.conflicts >= self.conflicts) \
+            or (self.propagations is not None and solver.propagations >= self.propagations) \
+            or (self.deadline is not None and time.time() >= self.deadline) \
+            or (self.interrupt is not None and bool(self.interrupt()))
+
+    def poll(self, solver):
+        """每 interval 次决策检查一次，长时间没有冲突的传播与决策也能按时停止"""
+        return solver.decisions % self.interval == 0 and self.exceeded(solver)
+
+    def remaining(self, solver):
+        """剩余的限制，作为参数传给 solve()，使多次调用共用同一个 Budget"""
+        now = time.time()
+        return {"conflicts": None if self.conflicts is None else max(self.conflicts - solver.conflicts, 0),
+                "propagations": None if self.propagations is None else max(self.propagations - solver.propagations, 0),
+                "timeout": None if self.deadline is None else max(self.deadline - now, 0.0),
+                "interrupt": self.interrupt}
@@ -0,0 +1,396 @@
+import asyncio
+import itertools
+import json
+import multiprocessing as mp
+import os
+import signal
+import time
+from typing import Dict, Tuple
+from urllib.parse import parse_qsl, urlsplit
+from clausedb import ClauseDB
+from DPLL import DPLL, CDCL
+from heuristic import HEURISTICS
+from search import RESTARTS
+from solver import Solver
+from stats import Stats
+import dimacs
+
+SOLVERS = ["solver", "cdcl", "dpll"]
+# 二进制请求体为 ClauseDB.tobytes() 的内容
+BINARY = "application/octet-stream"
+# forkserver 预先导入的模块
+PRELOAD = ["clausedb", "dimacs", "solver", "DPLL", "stats"]
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 409: "Conflict", 413: "Payload Too Large",
+           503: "Service Unavailable"}
+
+
+def _solve(task: Dict, cancelled) -> Dict:
+    """在工作进程中求解一个请求，返回可序列化为 JSON 的结果"""
+    record = {"id": task["id"], "result": "UNKNOWN", "worker": os.getpid()}
+    stats = Stats()
+    try:
+        s = time.time()
+        try:
+            if task["binary"]:
+                db = ClauseDB.frombytes(task["payload"])
+            else:
+                db = dimacs.loads(task["payload"])[0]
+        except (ValueError, IndexError) as e:
+            record.update(status=400, error=f"invalid payload: {e!r}")
+            return record
+        record["parse_time"] = time.time() - s
+        s = time.time()
+        kwargs = {"heuristic": task["heuristic"]} if task["heuristic"] else {}
+        if task["restart"] and task["solver"] != "dpll":
+            kwargs["restart"] = task["restart"]
+        if task["solver"] == "solver":
+            engine = Solver(db, **kwargs)
+        elif task["solver"] in ("cdcl", "dpll"):
+            forms, vars = db.toFormulas()
+            engine = (CDCL if task["solver"] == "cdcl" else DPLL)(forms, vars, **kwargs)
+        else:
+            raise ValueError(f"unknown solver {task['solver']!r}")
+        ret = engine.solve(conflicts=task["conflicts"], timeout=task["timeout"], interrupt=lambda: cancelled.value)
+        record["solve_time"] = time.time() - s
+        record["stats"] = stats.collect(engine).toDict()
+        if ret is None:
+            record["error"] = "cancelled" if cancelled.value else "limit"
+            return record
+        record["result"] = "SAT" if ret else "UNSAT"
+        if ret and task["model"]:
+            if task["solver"] == "solver":
+                record["model"] = engine.model()
+            else:
+                record["model"] = [i + 1 if var.value else -i - 1 for i, var in enumerate(vars)]
+    except Exception as e:
+        record["error"] = repr(e)
+    return record
+
+
+def _serve(conn, cancelled):
+    """工作进程：模块已经导入，循环接收请求直到收到 None 或连接关闭"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        conn.send(_solve(task, cancelled))
+
+
+class Worker:
+    """预先启动的求解进程，通过管道收发请求；cancelled 为共享的中断标志，求解器在冲突之间检查"""
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.start()
+
+    def start(self):
+        self.conn, child = self.ctx.Pipe()
+        self.cancelled = self.ctx.RawValue("b", 0)
+        self.proc = self.ctx.Process(target=_serve, args=(child, self.cancelled), daemon=True)
+        self.proc.start()
+        child.close()
+
+    async def solve(self, task: Dict) -> Dict:
+        """发送请求并在事件循环中等待结果，管道可读时才读取"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        conn = self.conn
+        fd = conn.fileno()
+
+        def ready():
+            loop.remove_reader(fd)
+            if future.done():
+                return
+            try:
+                future.set_result(conn.recv())
+            except (EOFError, OSError) as e:
+                future.set_exception(e)
+
+        self.cancelled.value = 0
+        self.conn.send(task)
+        loop.add_reader(fd, ready)
+        try:
+            return await future
+        finally:
+            # restart() 之后描述符可能已被新的管道复用
+            if not conn.closed:
+                loop.remove_reader(fd)
+
+    def cancel(self):
+        self.cancelled.value = 1
+
+    def restart(self):
+        """强制结束并重新启动，用于不响应中断或异常退出的进程"""
+        asyncio.get_running_loop().remove_reader(self.conn.fileno())
+        self.proc.kill()
+        self.proc.join()
+        self.conn.close()
+        self.start()
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.proc.join(1)
+        if self.proc.is_alive():
+            self.proc.kill()
+            self.proc.join()
+        self.conn.close()
+
+
+class Server:
+    """
+    本地求解服务：HTTP/1.1 (TCP 或 Unix 套接字)，每个连接一个请求。
+    POST /solve 的请求体为 DIMACS 文本，Content-Type 为 application/octet-stream 时为 ClauseDB.tobytes() 的内容；
+    查询参数 solver、heuristic、restart、conflicts、timeout、model=0、id。
+    请求在空闲进程队列上排队，排队的请求超过 max_queue 时返回 503。时间限制包括排队时间，
+    求解器在冲突之间主动停止，超过限制 grace 秒仍未返回的进程被强制重启。
+    POST /cancel?id= 或客户端断开连接会中断对应的请求。GET /stats 返回服务的计数。
+    """
+
+    def __init__(self, workers: int = None, timeout: float = 60, max_timeout: float = 3600, max_queue: int = 1000,
+                 max_body: int = 1 << 28, grace: float = 1.0):
+        # 工作进程由 forkserver 进程 fork，不会继承服务进程中已经打开的连接；求解模块在 forkserver 中预先导入
+        if "forkserver" in mp.get_all_start_methods():
+            self.ctx = mp.get_context("forkserver")
+            self.ctx.set_forkserver_preload(PRELOAD)
+        else:
+            self.ctx = mp.get_context("spawn")
+        self.size = workers or os.cpu_count()
+        self.timeout = timeout
+        self.max_timeout = max_timeout
+        self.max_queue = max_queue
+        self.max_body = max_body
+        self.grace = grace
+        self.workers = []
+        self.idle: asyncio.Queue = None
+        # 请求 id -> 停止事件
+        self.requests: Dict[str, asyncio.Event] = {}
+        self.ids = itertools.count(1)
+        self.queued = self.busy = 0
+        self.counts = {"requests": 0, "SAT": 0, "UNSAT": 0, "UNKNOWN": 0, "rejected": 0, "cancelled": 0,
+                       "restarts": 0}
+        self.started = time.time()
+
+    async def start(self):
+        self.idle = asyncio.Queue()
+        self.workers = [Worker(self.ctx) for _ in range(self.size)]
+        for worker in self.workers:
+            self.idle.put_nowait(worker)
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+    def stats(self):
+        return {"workers": self.size, "busy": self.busy, "queued": self.queued,
+                "uptime": time.time() - self.started, **self.counts}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            status, body = await self.dispatch(reader)
+        except (ValueError, KeyError, asyncio.IncompleteReadError) as e:
+            status, body = 400, {"error": repr(e)}
+        except ConnectionError:
+            status, body = 0, {}
+        if status:
+            data = json.dumps(body).encode()
+            writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode() + data)
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+        writer.close()
+
+    async def dispatch(self, reader: asyncio.StreamReader) -> Tuple[int, Dict]:
+        """读取请求并分发，返回 (状态码, JSON)，客户端已断开时状态码为 0"""
+        line = await reader.readline()
+        if not line:
+            return 0, {}
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        url = urlsplit(target)
+        query = dict(parse_qsl(url.query))
+        if method == "GET" and url.path == "/stats":
+            return 200, self.stats()
+        if method == "POST" and url.path == "/cancel":
+            stop = self.requests.get(query.get("id"))
+            if stop is not None:
+                stop.set()
+            return 200, {"id": query.get("id"), "cancelled": stop is not None}
+        if method != "POST" or url.path != "/solve":
+            return 404, {"error": f"no route for {method} {url.path}"}
+        length = int(headers.get("content-length", 0))
+        if length > self.max_body:
+            return 413, {"error": f"body larger than {self.max_body} bytes"}
+        payload = await reader.readexactly(length)
+        # 参数错误在占用工作进程之前返回
+        for name, choices in (("solver", SOLVERS), ("heuristic", HEURISTICS), ("restart", RESTARTS)):
+            if query.get(name) and query[name] not in choices:
+                return 400, {"error": f"unknown {name} {query[name]!r}, expected one of {', '.join(choices)}"}
+        # id 用于取消，正在处理的请求中不能重复；自动编号跳过客户端已经使用的 id
+        rid = query.get("id")
+        if not rid:
+            rid = str(next(self.ids))
+            while rid in self.requests:
+                rid = str(next(self.ids))
+        elif rid in self.requests:
+            self.counts["rejected"] += 1
+            return 409, {"error": f"request {rid} is already in flight", "id": rid}
+        if self.queued >= self.max_queue:
+            self.counts["rejected"] += 1
+            return 503, {"error": "queue is full", "queued": self.queued}
+        task = {
+            "id": rid,
+            "payload": payload,
+            "binary": headers.get("content-type", "").split(";")[0].strip() == BINARY,
+            "solver": query.get("solver", "solver"),
+            "heuristic": query.get("heuristic"),
+            "restart": query.get("restart"),
+            "conflicts": int(query["conflicts"]) if "conflicts" in query else None,
+            "timeout": min(float(query.get("timeout", self.timeout)), self.max_timeout),
+            "model": query.get("model", "1") not in ("0", "false"),
+        }
+        record = await self.solve(task, reader)
+        return (record.pop("status", 200), record) if record is not None else (0, {})
+
+    async def solve(self, task: Dict, reader: asyncio.StreamReader):
+        """排队等待空闲进程并求解，客户端断开时返回 None"""
+        self.counts["requests"] += 1
+        stop = self.requests[task["id"]] = asyncio.Event()
+        start = time.time()
+        # 每个连接只有一个请求，之后读到 EOF 说明客户端已经断开
+        gone = asyncio.ensure_future(reader.read(1))
+
+        def left():
+            return gone.done() and not gone.cancelled() and (gone.exception() is not None or not gone.result())
+
+        gone.add_done_callback(lambda f: left() and stop.set())
+        stopped = asyncio.ensure_future(stop.wait())
+        worker = None
+        try:
+            self.queued += 1
+            get = asyncio.ensure_future(self.idle.get())
+            try:
+                await asyncio.wait({get, stopped}, timeout=task["timeout"], return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                self.queued -= 1
+            if not get.done():
+                get.cancel()
+                self.counts["UNKNOWN"] += 1
+                if stop.is_set():
+                    self.counts["cancelled"] += 1
+                    return None if left() else {"id": task["id"], "result": "UNKNOWN", "error": "cancelled"}
+                return {"id": task["id"], "result": "UNKNOWN", "error": "timeout", "queue_time": time.time() - start}
+            worker = get.result()
+            task["timeout"] = max(task["timeout"] - (time.time() - start), 0)
+            record = await self.run(worker, task, stopped)
+            if record.get("status") == 400:
+                return record
+            record["queue_time"] = time.time() - start - record.get("parse_time", 0) - record.get("solve_time", 0)
+            self.counts[record["result"]] += 1
+            if record.get("error") == "cancelled":
+                self.counts["cancelled"] += 1
+                if left():
+                    return None
+            return record
+        finally:
+            # 先归还进程，之后的清理出错也不会让进程池变小
+            if worker is not None:
+                self.idle.put_nowait(worker)
+            self.requests.pop(task["id"], None)
+            gone.cancel()
+            stopped.cancel()
+
+    async def run(self, worker: Worker, task: Dict, stopped: asyncio.Future) -> Dict:
+        """在进程中求解：停止事件触发时设置中断标志，超时或不响应时重启进程"""
+        self.busy += 1
+        running = asyncio.ensure_future(worker.solve(task))
+        try:
+            await asyncio.wait({running, stopped}, timeout=task["timeout"] + self.grace,
+                               return_when=asyncio.FIRST_COMPLETED)
+            if not running.done() and stopped.done():
+                worker.cancel()
+                await asyncio.wait({running}, timeout=self.grace)
+            if running.done() and not running.exception():
+                return running.result()
+            error = "cancelled" if stopped.done() else "timeout"
+            if running.done():
+                error = f"worker exited: {running.exception()!r}"
+            running.cancel()
+            worker.restart()
+            self.counts["restarts"] += 1
+            return {"id": task["id"], "result": "UNKNOWN", "error": error}
+        finally:
+            self.busy -= 1
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8765, unix: str = None, **kwargs):
+    server = Server(**kwargs)
+    await server.start()
+    try:
+        if unix:
+            listener = await asyncio.start_unix_server(server.handle, unix)
+        else:
+            listener = await asyncio.start_server(server.handle, host, port)
+        stop = asyncio.Event()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+        print(f"serving on {unix or f'http://{host}:{port}'} with {server.size} workers", flush=True)
+        async with listener:
+            await stop.wait()
+    finally:
+        server.close()
+
+
+async def request(payload: bytes, host: str = "127.0.0.1", port: int = 8765, unix: str = None,
+                  binary: bool = False, path: str = "/solve", **params) -> Dict:
+    """客户端：发送一个请求并返回解码后的 JSON，params 为查询参数"""
+    if unix:
+        reader, writer = await asyncio.open_unix_connection(unix)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    query = "&".join(f"{k}={v}" for k, v in params.items() if v is not None)
+    writer.write(f"POST {path}{'?' + query if query else ''} HTTP/1.1\r\nHost: {host}\r\n"
+                 f"Content-Type: {BINARY if binary else 'text/plain'}\r\nContent-Length: {len(payload)}\r\n\r\n"
+                 .encode() + payload)
+    await writer.drain()
+    try:
+        data = await reader.read()
+    finally:
+        writer.close()
+    head, _, body = data.partition(b"\r\n\r\n")
+    record = json.loads(body)
+    record.setdefault("status", int(head.split()[1]))
+    return record
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="local solver service with a pool of warm worker processes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="listen on a Unix socket instead of TCP")
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=60, help="default seconds per request")
+    parser.add_argument("--max-timeout", type=float, default=3600)
+    parser.add_argument("--max-queue", type=int, default=1000)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, workers=args.workers, timeout=args.timeout,
+                          max_timeout=args.max_timeout, max_queue=args.max_queue))
+    except KeyboardInterrupt:
+        pass
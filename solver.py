@@ -0,0 +1,496 @@
+from random import Random
+from typing import Callable, List, Union
+from clausedb import ClauseDB, toDimacs, toLit
+from heuristic import Heuristic, HEURISTICS
+from proof import Proof
+from search import Budget, Restart, RESTARTS
+
+
+class Solver:
+    """
+    直接运行在 ClauseDB 上的 CDCL 求解器，文字与子句均为整数下标。
+    学习子句追加到同一个子句库中，reduceDB() 删除学习子句后会整理子句库与监视列表。
+    """
+
+    def __init__(self, db: ClauseDB, heuristic: Union[str, Heuristic] = "vsids",
+                 max_learnts: float = None, clause_decay: float = 0.999, seed: int = None,
+                 restart: Union[str, Restart] = "luby", proof: Proof = None):
+        self.db = db
+        n = db.nvars
+        if isinstance(heuristic, str):
+            heuristic = HEURISTICS[heuristic](n)
+        self.heuristic = heuristic
+        self.heuristic.init(db.clauses())
+        if seed is not None:
+            self.heuristic.randomize(Random(seed))
+        if isinstance(restart, str):
+            restart = RESTARTS[restart]()
+        self.restart = restart
+        # 以文字为下标：1 为真，0 为假，-1 为未指派
+        self.value = [-1] * (2 * n)
+        # 以变元为下标
+        self.level = [0] * n
+        self.reason = [-1] * n
+        self.seen = bytearray(n)
+        # watches[lit] 为以 lit 为前两个文字之一的子句，lit 被置假时访问
+        self.watches: List[List[int]] = [[] for i in range(2 * n)]
+        self.trail: List[int] = []
+        self.trail_lim: List[int] = []
+        self.qhead = 0
+        # 学习子句的下标及其活跃度
+        self.learnts: List[int] = []
+        self.activity = {}
+        self.cla_inc = 1.0
+        self.clause_decay = clause_decay
+        self.max_learnts = max_learnts if max_learnts is not None else max(len(db) / 3, 100)
+        # 统计计数，由 stats.Stats.collect() 读取
+        self.conflicts = self.propagations = self.restarts = 0
+        self.decisions = self.backtracks = self.max_depth = self.learned = 0
+        # 与其他求解器交换学习子句：export 接收每个学习子句，imports 每 import_interval 次冲突取回其他求解器的子句
+        self.export: Callable[[List[int]], None] = None
+        self.imports: Callable[[], List[List[int]]] = None
+        self.import_interval = 1000
+        # 每 progress_interval 次冲突以求解器为参数调用一次 progress
+        self.progress: Callable[["Solver"], None] = None
+        self.progress_interval = 1000
+        # 内存预算(memory.Memory.attach() 设置)，每 memory_interval 次冲突检查一次
+        self.memory = None
+        self.memory_interval = 100
+        # 上一次以假设求解得到 UNSAT 时，导致冲突的假设(DIMACS)
+        self.core: List[int] = []
+        # DRAT 证明：记录学习子句、reduceDB() 删除的子句与不可满足时的空子句
+        self.proof = proof
+        self.ok = self.watch()
+
+    def watch(self):
+        """为所有子句建立监视，单元子句直接指派，遇到空子句或矛盾的单元子句返回False"""
+        lits, offsets = self.db.lits, self.db.offsets
+        for c in range(len(offsets) - 1):
+            start, end = offsets[c], offsets[c + 1]
+            if end - start > 1:
+                self.watches[lits[start]].append(c)
+                self.watches[lits[start + 1]].append(c)
+            elif end == start or self.value[lits[start]] == 0:
+                return False
+            elif self.value[lits[start]] < 0:
+                self.assign(lits[start], -1)
+        return True
+
+    def grow(self, nvars: int):
+        """增加变元到 nvars 个"""
+        n = len(self.level)
+        if nvars <= n:
+            return
+        self.db.nvars = max(self.db.nvars, nvars)
+        self.value += [-1] * (2 * (nvars - n))
+        self.level += [0] * (nvars - n)
+        self.reason += [-1] * (nvars - n)
+        self.seen += bytearray(nvars - n)
+        self.watches += [[] for i in range(2 * (nvars - n))]
+        self.heuristic.grow(nvars)
+
+    def add_clause(self, clause: List[int]):
+        """在两次 solve() 之间加入一个 DIMACS 子句，学习子句与其余状态保留，返回公式是否仍可能满足"""
+        if not self.ok:
+            return False
+        lits = [toLit(d) for d in clause]
+        if lits:
+            self.grow(max(lits) // 2 + 1)
+        self.backtrack(0)
+        return self.addLits(lits)
+
+    def addLits(self, lits: List[int], learnt: bool = False):
+        """在第 0 层加入子句：去掉已为假的文字，已满足或重言的子句忽略，返回公式是否仍可能满足"""
+        value = self.value
+        clause = []
+        for lit in dict.fromkeys(lits):
+            if value[lit] == 1 or lit ^ 1 in clause:
+                return True
+            if value[lit] < 0:
+                clause.append(lit)
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.assign(clause[0], -1)
+            self.ok = self.propagate() < 0
+        else:
+            c = self.db.addLits(clause)
+            self.watches[clause[0]].append(c)
+            self.watches[clause[1]].append(c)
+            if learnt:
+                self.learnts.append(c)
+                self.activity[c] = 0.0
+        return self.ok
+
+    def assign(self, lit: int, reason: int):
+        """指派文字为真并记录到轨迹"""
+        var = lit >> 1
+        self.value[lit] = 1
+        self.value[lit ^ 1] = 0
+        self.level[var] = len(self.trail_lim)
+        self.reason[var] = reason
+        self.trail.append(lit)
+
+    def propagate(self):
+        """传播轨迹上的新指派，只访问监视被置假文字的子句，返回冲突子句下标，无冲突返回 -1"""
+        lits, offsets = self.db.lits, self.db.offsets
+        value, watches, trail = self.value, self.watches, self.trail
+        while self.qhead < len(trail):
+            false_lit = trail[self.qhead] ^ 1
+            self.qhead += 1
+            self.propagations += 1
+            ws = watches[false_lit]
+            i = j = 0
+            n = len(ws)
+            while i < n:
+                c = ws[i]
+                i += 1
+                # 保证被置假的文字位于子句的第二个位置
+                start = offsets[c]
+                first = lits[start]
+                if first == false_lit:
+                    first = lits[start + 1]
+                    lits[start] = first
+                    lits[start + 1] = false_lit
+                if value[first] == 1:
+                    ws[j] = c
+                    j += 1
+                    continue
+                for k in range(start + 2, offsets[c + 1]):
+                    lit = lits[k]
+                    if value[lit] != 0:
+                        lits[start + 1] = lit
+                        lits[k] = false_lit
+                        watches[lit].append(c)
+                        break
+                else:
+                    ws[j] = c
+                    j += 1
+                    if value[first] < 0:
+                        self.assign(first, c)
+                    else:
+                        ws[j:] = ws[i:]
+                        self.qhead = len(trail)
+                        return c
+            del ws[j:]
+        return -1
+
+    def decide(self, assumptions: List[int] = ()):
+        """先依次把假设作为决策，再由分支启发式选择决策文字；全部指派时返回False，假设为假时返回None"""
+        while len(self.trail_lim) < len(assumptions):
+            p = assumptions[len(self.trail_lim)]
+            if self.value[p] == 0:
+                self.core = self.analyzeFinal(p)
+                return None
+            self.newLevel()
+            # 已经为真的假设只占一个空的决策层
+            if self.value[p] < 0:
+                self.assign(p, -1)
+                return True
+        var = self.heuristic.pick(self.isAssigned)
+        if var < 0:
+            return False
+        self.newLevel()
+        self.assign(2 * var + (not self.heuristic.phase[var]), -1)
+        return True
+
+    def newLevel(self):
+        self.trail_lim.append(len(self.trail))
+        self.decisions += 1
+        if len(self.trail_lim) > self.max_depth:
+            self.max_depth = len(self.trail_lim)
+
+    def isAssigned(self, var: int):
+        return self.value[2 * var] >= 0
+
+    def backtrack(self, level: int):
+        """回溯到第level层：一次截断撤销该层之后的全部指派"""
+        if level >= len(self.trail_lim):
+            return
+        self.backtracks += 1
+        trail, value, heuristic = self.trail, self.value, self.heuristic
+        start = self.trail_lim[level]
+        for i in range(start, len(trail)):
+            lit = trail[i]
+            heuristic.unassign(lit >> 1, not lit & 1)
+            value[lit] = value[lit ^ 1] = -1
+        del trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = start
+
+    def analyze(self, conflict: int):
+        """1-UIP 冲突分析，返回学习子句(UIP 的否定在首位)与回跳层"""
+        lits, offsets = self.db.lits, self.db.offsets
+        seen, level, reason, trail = self.seen, self.level, self.reason, self.trail
+        current = len(self.trail_lim)
+        learnt = [-1]
+        counter = 0
+        index = len(trail)
+        c = conflict
+        p = -1
+        while True:
+            if c in self.activity:
+                self.bump(c)
+            for k in range(offsets[c], offsets[c + 1]):
+                q = lits[k]
+                var = q >> 1
+                if q == p or seen[var] or level[var] == 0:
+                    continue
+                seen[var] = 1
+                self.heuristic.bump(var)
+                if level[var] == current:
+                    counter += 1
+                else:
+                    learnt.append(q)
+            # 沿轨迹找到最近被标记的文字
+            index -= 1
+            while not seen[trail[index] >> 1]:
+                index -= 1
+            p = trail[index]
+            seen[p >> 1] = 0
+            counter -= 1
+            if not counter:
+                break
+            c = reason[p >> 1]
+        learnt[0] = p ^ 1
+        # 去掉推理原因中其余文字都已在学习子句中的文字
+        kept = [learnt[0]]
+        for q in learnt[1:]:
+            c = reason[q >> 1]
+            if c < 0 or any(not seen[lits[k] >> 1] and level[lits[k] >> 1] > 0
+                            for k in range(offsets[c], offsets[c + 1]) if lits[k] != q ^ 1):
+                kept.append(q)
+        for q in learnt[1:]:
+            seen[q >> 1] = 0
+        learnt = kept
+        # 回跳到学习子句中除 UIP 外的最高层，并把该文字放在第二个位置
+        back_level = 0
+        for i in range(1, len(learnt)):
+            if level[learnt[i] >> 1] > back_level:
+                back_level = level[learnt[i] >> 1]
+                learnt[1], learnt[i] = learnt[i], learnt[1]
+        return learnt, back_level
+
+    def analyzeFinal(self, p: int):
+        """假设 p 已被置假，沿轨迹找出推出 ~p 的假设，返回这些假设与 p(DIMACS)"""
+        core = [toDimacs(p)]
+        seen, reason, trail = self.seen, self.reason, self.trail
+        lits, offsets = self.db.lits, self.db.offsets
+        if self.level[p >> 1] == 0:
+            return core
+        seen[p >> 1] = 1
+        for i in range(len(trail) - 1, self.trail_lim[0] - 1, -1):
+            var = trail[i] >> 1
+            if not seen[var]:
+                continue
+            seen[var] = 0
+            if reason[var] < 0:
+                core.append(toDimacs(trail[i]))
+            else:
+                for k in range(offsets[reason[var]], offsets[reason[var] + 1]):
+                    if lits[k] >> 1 != var and self.level[lits[k] >> 1] > 0:
+                        seen[lits[k] >> 1] = 1
+        return core
+
+    def learn(self, learnt: List[int]):
+        """把学习子句加入子句库并由其推出 UIP 文字"""
+        self.learned += 1
+        if self.proof is not None:
+            self.proof.addLits(learnt)
+        if len(learnt) == 1:
+            self.assign(learnt[0], -1)
+            return
+        c = self.db.addLits(learnt)
+        self.watches[learnt[0]].append(c)
+        self.watches[learnt[1]].append(c)
+        self.learnts.append(c)
+        self.activity[c] = 0.0
+        self.bump(c)
+        self.assign(learnt[0], c)
+
+    def bump(self, c: int):
+        """提高学习子句的活跃度"""
+        self.activity[c] += self.cla_inc
+        if self.activity[c] > 1e20:
+            for k in self.activity:
+                self.activity[k] *= 1e-20
+            self.cla_inc *= 1e-20
+
+    def locked(self, c: int):
+        """子句是否正作为其首个文字的推理原因"""
+        first = self.db.lits[self.db.offsets[c]]
+        return self.reason[first >> 1] == c and self.value[first] == 1
+
+    def reduceDB(self):
+        """删除活跃度较低的一半学习子句(保留二元子句与推理原因)，然后整理子句库"""
+        offsets = self.db.offsets
+        self.learnts.sort(key=self.activity.__getitem__)
+        half = len(self.learnts) // 2
+        removed = set()
+        for i, c in enumerate(self.learnts):
+            if i < half and offsets[c + 1] - offsets[c] > 2 and not self.locked(c):
+                removed.add(c)
+                if self.proof is not None:
+                    self.proof.deleteLits(self.db[c])
+        self.collect(removed)
+        self.max_learnts *= 1.1
+
+    def collect(self, removed: set):
+        """从子句库中删去给定子句，重排子句下标并重建监视列表与推理原因"""
+        db = self.db
+        lits, offsets = db.lits, db.offsets
+        remap = {}
+        db.lits = type(lits)(lits.typecode)
+        db.offsets = type(offsets)(offsets.typecode, [0])
+        for c in range(len(offsets) - 1):
+            if c not in removed:
+                remap[c] = len(db.offsets) - 1
+                db.lits.extend(lits[offsets[c]:offsets[c + 1]])
+                db.offsets.append(len(db.lits))
+        self.learnts = [remap[c] for c in self.learnts if c in remap]
+        self.activity = {remap[c]: a for c, a in self.activity.items() if c in remap}
+        for var in range(db.nvars):
+            if self.reason[var] >= 0:
+                self.reason[var] = remap.get(self.reason[var], -1)
+        for ws in self.watches:
+            ws.clear()
+        lits, offsets = db.lits, db.offsets
+        for c in range(len(offsets) - 1):
+            if offsets[c + 1] - offsets[c] > 1:
+                self.watches[lits[offsets[c]]].append(c)
+                self.watches[lits[offsets[c] + 1]].append(c)
+
+    def solve(self, assumptions: List[int] = (), conflicts: int = None, propagations: int = None,
+              timeout: float = None, interrupt: Callable[[], bool] = None):
+        """
+        返回 True(SAT) 或 False(UNSAT)，可以多次调用。assumptions 为本次求解假设为真的 DIMACS 文字，
+        因假设得到 UNSAT 时 core 为其中导致冲突的部分，公式本身不可满足时 core 为空。
+        超出本次调用的冲突次数、传播次数、秒数限制或 interrupt() 返回真时返回 None(UNKNOWN)。
+        """
+        budget = Budget(self, conflicts, propagations, timeout, interrupt)
+        self.core = []
+        self.backtrack(0)
+        assumptions = [toLit(d) for d in assumptions]
+        if assumptions:
+            self.grow(max(assumptions) // 2 + 1)
+        if not self.ok or self.propagate() >= 0:
+            return self.refute()
+        return self.search(assumptions, budget)
+
+    def search(self, assumptions: List[int], budget: Budget):
+        """从当前轨迹继续搜索，assumptions 为文字编码，返回值与 solve() 相同"""
+        while True:
+            conflict = self.propagate()
+            if conflict >= 0:
+                if not self.trail_lim:
+                    return self.refute()
+                self.conflicts += 1
+                learnt, level = self.analyze(conflict)
+                lbd = len({self.level[lit >> 1] for lit in learnt})
+                restart = self.restart.conflict(lbd, len(self.trail))
+                self.backtrack(level)
+                self.learn(learnt)
+                if self.export is not None:
+                    self.export(learnt)
+                self.cla_inc /= self.clause_decay
+                self.heuristic.decay()
+                if len(self.learnts) - len(self.trail) >= self.max_learnts:
+                    self.reduceDB()
+                if self.memory is not None and self.conflicts % self.memory_interval == 0:
+                    self.memory.check(self)
+                if budget.exceeded(self):
+                    self.backtrack(0)
+                    return None
+                if restart:
+                    self.restarts += 1
+                    self.restart.restart()
+                    self.backtrack(0)
+                if self.progress is not None and self.conflicts % self.progress_interval == 0:
+                    self.progress(self)
+                if self.imports is not None and self.conflicts % self.import_interval == 0:
+                    # 导入的子句在第 0 层加入
+                    self.backtrack(0)
+                    for lits in self.imports():
+                        if not self.addLits(lits, True):
+                            return self.refute()
+            else:
+                if budget.poll(self):
+                    self.backtrack(0)
+                    return None
+                decided = self.decide(assumptions)
+                if not decided:
+                    return decided is not None
+
+    def models(self, assumptions: List[int] = (), projection: List[int] = None, conflicts: int = None,
+               propagations: int = None, timeout: float = None, interrupt: Callable[[], bool] = None):
+        """
+        逐个产生 assumptions 下的 DIMACS 模型。每个模型之后由 block() 加入否定全部假设与决策的阻塞子句，
+        给出 projection(DIMACS 变元)时为否定投影变元取值的子句，每个投影只产生一次。
+        阻塞子句不是学习子句，不会被 reduceDB() 删除，之后的 solve() 也不会再得到这些模型。
+        搜索限制对整个枚举计算，超出时产生 None 后结束。
+        """
+        budget = Budget(self, conflicts, propagations, timeout, interrupt)
+        self.core = []
+        self.backtrack(0)
+        assumptions = [toLit(d) for d in assumptions]
+        if assumptions:
+            self.grow(max(assumptions) // 2 + 1)
+        if not self.ok or self.propagate() >= 0:
+            self.refute()
+            return
+        while True:
+            ret = self.search(assumptions, budget)
+            if ret is None:
+                yield None
+            if not ret:
+                return
+            model = self.model()
+            if projection is None:
+                # 空的假设层的起点属于下一层，假设直接取自 assumptions
+                decisions = [self.trail[i] for i in self.trail_lim[len(assumptions):]]
+                lits = [lit ^ 1 for lit in assumptions + decisions]
+            else:
+                lits = [toLit(-model[v - 1]) for v in projection]
+            # 先阻塞再产生模型，调用方不再继续时下一次求解也不会重复得到这个模型
+            ok = self.block(lits)
+            yield model
+            if not ok:
+                return
+            if budget.exceeded(self):
+                yield None
+                return
+
+    def block(self, lits: List[int]):
+        """
+        加入在当前指派下全部为假的子句：回跳到子句中次高的决策层，最高层只有一个文字时它成为单元并被推出，
+        否则回跳到最高层之前。全部文字都在第 0 层时公式不再可满足，返回 False
+        """
+        level = self.level
+        lits = sorted(dict.fromkeys(lits), key=lambda lit: -level[lit >> 1])
+        if not lits or level[lits[0] >> 1] == 0:
+            self.ok = False
+            return False
+        if len(lits) == 1:
+            self.backtrack(0)
+            self.assign(lits[0], -1)
+            return True
+        c = self.db.addLits(lits)
+        self.watches[lits[0]].append(c)
+        self.watches[lits[1]].append(c)
+        if level[lits[0] >> 1] > level[lits[1] >> 1]:
+            self.backtrack(level[lits[1] >> 1])
+            self.assign(lits[0], c)
+        else:
+            self.backtrack(level[lits[0] >> 1] - 1)
+        return True
+
+    def refute(self):
+        """公式本身不可满足：在证明中记录空子句，返回 False"""
+        self.ok = False
+        if self.proof is not None:
+            self.proof.add(())
+        return False
+
+    def model(self):
+        """以 DIMACS 整数列表返回当前指派，未指派的变元取正"""
+        return [toDimacs(2 * v + (self.value[2 * v] == 0)) for v in range(self.db.nvars)]
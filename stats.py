@@ -0,0 +1,112 @@
+import json
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Iterable
+from memory import rss
+
+# 求解器自身维护的计数(整数属性)，collect() 读取时不存在的计为 0
+COUNTERS = ["decisions", "propagations", "conflicts", "backtracks", "max_depth", "restarts", "learned"]
+# profile 时计时的方法，只包装求解器上存在的方法
+PHASES = ["rule1", "rule2", "rule3", "rule4", "backtrack", "propagate", "decide", "analyze", "reduceDB"]
+
+
+class Stats:
+    """
+    求解统计：计数由求解器以整数属性的形式一直维护，几乎没有开销，collect() 时才复制过来；
+    timer() 记录解析、建图等阶段的耗时；profile 为真时 instrument() 在求解器实例上包装 PHASES 中的方法，
+    记录各方法的调用次数与耗时，不开启时不包装，求解器的代码路径不变。
+    """
+
+    def __init__(self, profile: bool = False):
+        self.profile = profile
+        self.counters: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+        self.timers: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        # 进程的峰值常驻内存及其增长，以及挂载了 memory.Memory 时的估计值与峰值(字节)
+        self.memory: Dict = {}
+        self.start_rss = rss()
+
+    @contextmanager
+    def timer(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float, calls: int = 1):
+        self.timers[name] = self.timers.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + calls
+
+    def instrument(self, solver, phases: Iterable[str] = PHASES):
+        """profile 时为求解器实例的方法计时，返回求解器"""
+        if not self.profile:
+            return solver
+        for name in phases:
+            method = getattr(solver, name, None)
+            if method is not None:
+                setattr(solver, name, self.wrap(name, method))
+        return solver
+
+    def wrap(self, name: str, method):
+        timers, calls, clock = self.timers, self.calls, time.perf_counter
+        timers.setdefault(name, 0.0)
+        calls.setdefault(name, 0)
+
+        @wraps(method)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                timers[name] += clock() - start
+                calls[name] += 1
+        return timed
+
+    def collect(self, solver):
+        """读取求解器的计数，返回自身"""
+        for name in COUNTERS:
+            self.counters[name] = getattr(solver, name, 0)
+        learnts = getattr(solver, "learnts", None)
+        if learnts is not None:
+            self.counters["learnts"] = len(learnts)
+        # ru_maxrss 是整个进程的峰值，复用的工作进程中包含之前的实例；
+        # rss_growth 只在本次求解超过之前的峰值时非零，单个实例的峰值见 Memory 的估计值 peak
+        peak = rss()
+        self.memory["worker_peak_rss"] = peak
+        self.memory["rss_growth"] = peak - self.start_rss
+        if getattr(solver, "memory", None) is not None:
+            self.memory.update(solver.memory.toDict())
+        return self
+
+    def toDict(self):
+        return {"counters": dict(self.counters), "timers": dict(self.timers), "calls": dict(self.calls),
+                "memory": dict(self.memory)}
+
+    def toJSON(self, **kwargs):
+        return json.dumps(self.toDict(), **kwargs)
+
+    def __str__(self):
+        lines = [f"{name:12s} : {value}" for name, value in self.counters.items()]
+        for name, seconds in self.timers.items():
+            calls = self.calls.get(name, 0)
+            lines.append(f"{name:12s} : {1e3*seconds:.4f}ms" + (f" ({calls} calls)" if calls > 1 else ""))
+        if "worker_peak_rss" in self.memory:
+            lines.append(f"{'peak_rss':12s} : {self.memory['worker_peak_rss'] / (1 << 20):.1f}MB process, "
+                         f"+{self.memory['rss_growth'] / (1 << 20):.1f}MB since start")
+        if "peak" in self.memory:
+            lines.append(f"{'memory':12s} : {self.memory['estimated'] / (1 << 20):.1f}MB estimated, "
+                         f"{self.memory['peak'] / (1 << 20):.1f}MB peak")
+        return "\n".join(lines)
+
+
+def progress(stats: Stats, out=print):
+    """生成一个 progress 回调：每次调用时读取计数并输出一行"""
+    start = time.time()
+
+    def report(solver):
+        c = stats.collect(solver).counters
+        out(f"[{time.time()-start:8.2f}s] conflicts {c['conflicts']} decisions {c['decisions']} "
+            f"propagations {c['propagations']} restarts {c['restarts']} learnts {c.get('learnts', 0)}")
+    return report
@@ -0,0 +1,192 @@
+from typing import Dict, Iterable, List, Tuple
+from cg import Node, NodeType
+from clausedb import ClauseDB
+
+# 常量真为第一个信号：没有输入的与门
+TRUE, FALSE = 1, -1
+
+
+class Tseitin:
+    """
+    把 formula_for_common 的 |/&/~ 公式图编译为 ClauseDB 中的子句。
+    先把节点化简为信号：叶节点或与门(或门为输入取反的与门的否定)，信号的文字为 ±(下标+1)。
+    与门按输入文字的集合做哈希合并(hash-consing)，结构相同的子图、重复与互补的输入、常量都在这里化简。
+    生成子句时只按文字出现的极性给出单向定义(Plaisted-Greenbaum)，顶层的与、或直接拆成子句，
+    不引入辅助变元，因此本身就是 CNF 的公式编译后子句不变。DIMACS 变元在第一次写入子句时才分配。
+    """
+
+    def __init__(self, db: ClauseDB = None):
+        self.db = db if db is not None else ClauseDB()
+        # 信号的输入：叶节点为 None，与门为输入文字的元组
+        self.signals: List[Tuple[int, ...]] = [()]
+        self.gates: Dict[frozenset, int] = {frozenset(): TRUE}
+        # id(节点) -> (节点, 文字)，保留节点的引用使 id 不会被复用
+        self.nodes: Dict[int, Tuple[Node, int]] = {}
+        # 叶节点信号 -> 叶节点(x 与 ~x 中 id 较小的一方为正)
+        self.leaves: Dict[int, Node] = {}
+        # 信号下标 -> DIMACS 变元
+        self.vars: Dict[int, int] = {}
+        # 已经给出定义的极性：1 为正，2 为负
+        self.defined: Dict[int, int] = {}
+        self.asserted = set()
+
+    def mkAnd(self, lits: Iterable[int]) -> int:
+        children = set()
+        for lit in lits:
+            if lit == FALSE or -lit in children:
+                return FALSE
+            if lit != TRUE:
+                children.add(lit)
+        if len(children) == 1:
+            return children.pop()
+        key = frozenset(children)
+        if key not in self.gates:
+            self.signals.append(tuple(sorted(children, key=abs)))
+            self.gates[key] = len(self.signals)
+        return self.gates[key]
+
+    def mkOr(self, lits: Iterable[int]) -> int:
+        return -self.mkAnd(-lit for lit in lits)
+
+    def leaf(self, node: Node):
+        self.signals.append(None)
+        self.leaves[len(self.signals) - 1] = node
+        return len(self.signals)
+
+    def compile(self, node: Node) -> int:
+        """编译节点及其前驱，返回信号文字。只出现在叶节点 invert 上的分支节点(~(a | b))作为该叶节点的输入"""
+        nodes = self.nodes
+        stack = [(node, False)]
+        while stack:
+            n, expanded = stack.pop()
+            if id(n) in nodes:
+                continue
+            invert = getattr(n, "invert", None)
+            if n.nt == NodeType.BranchNode:
+                deps = n.prev_nodes
+            else:
+                deps = [invert] if invert is not None and invert.nt == NodeType.BranchNode else []
+            if not expanded:
+                stack.append((n, True))
+                stack.extend((d, False) for d in deps if id(d) not in nodes)
+                continue
+            if n.nt == NodeType.BranchNode:
+                lits = [nodes[id(p)][1] for p in n.prev_nodes]
+                if n.op.name == "and":
+                    lit = self.mkAnd(lits)
+                elif n.op.name == "or":
+                    lit = self.mkOr(lits)
+                elif n.op.name == "identity" and len(lits) == 1:
+                    lit = lits[0]
+                else:
+                    raise ValueError(f"Unsupported operator {n.op.name!r} in node {n.sid}.")
+            elif invert is None:
+                lit = self.leaf(n)
+            elif id(invert) in nodes:
+                lit = -nodes[id(invert)][1]
+            else:
+                # x 与 ~x 共用一个信号
+                first = n if getattr(n, "id", 0) <= getattr(invert, "id", 0) else invert
+                lit = self.leaf(first)
+                if first is not n:
+                    lit = -lit
+                nodes[id(invert)] = (invert, -lit)
+            nodes[id(n)] = (n, lit)
+        return nodes[id(node)][1]
+
+    def dimacs(self, lit: int) -> int:
+        """信号文字 -> DIMACS 整数，必要时分配新的变元"""
+        s = abs(lit) - 1
+        var = self.vars.get(s)
+        if var is None:
+            self.db.nvars += 1
+            var = self.vars[s] = self.db.nvars
+        return var if lit > 0 else -var
+
+    def clause(self, lits: List[int]):
+        """写入以信号文字表示的子句，其中的每个文字都需要按其极性定义"""
+        self.db.add([self.dimacs(lit) for lit in lits])
+        self.define(lits)
+
+    def define(self, lits: Iterable[int]):
+        """文字 g 出现在子句中时只需要 g -> 定义(g)：与门为真时每个输入为真，为假时至少一个输入为假"""
+        stack = list(lits)
+        while stack:
+            lit = stack.pop()
+            s = abs(lit) - 1
+            children = self.signals[s]
+            bit = 1 if lit > 0 else 2
+            if children is None or self.defined.get(s, 0) & bit:
+                continue
+            self.defined[s] = self.defined.get(s, 0) | bit
+            g = self.dimacs(lit)
+            if lit > 0:
+                for child in children:
+                    self.db.add([-g, self.dimacs(child)])
+                stack.extend(children)
+            else:
+                self.db.add([-g] + [self.dimacs(-child) for child in children])
+                stack.extend(-child for child in children)
+
+    def add(self, node: Node) -> int:
+        """断言公式为真：顶层的与拆成各个输入，顶层的或直接作为子句，返回公式的信号文字"""
+        lit = self.compile(node)
+        stack = [lit]
+        while stack:
+            lit = stack.pop()
+            if lit in self.asserted:
+                continue
+            self.asserted.add(lit)
+            children = self.signals[abs(lit) - 1]
+            if children is None:
+                self.clause([lit])
+            elif lit > 0:
+                stack.extend(children)
+            else:
+                self.clause([-child for child in children])
+        return lit
+
+    def var(self, node: Node) -> int:
+        """节点对应的 DIMACS 文字，可用作假设"""
+        lit = self.compile(node)
+        self.define([lit, -lit])
+        return self.dimacs(lit)
+
+    def assign(self, model: Iterable[int]):
+        """把 DIMACS 模型写回叶节点(setValue 同时设置 ~x)，之后可以用 cg.Graph 计算公式的值"""
+        value = {abs(d): d > 0 for d in model}
+        for s, node in self.leaves.items():
+            node.setValue(value.get(self.vars.get(s), False))
+
+
+def encode(formulas: Iterable[Node], db: ClauseDB = None) -> Tuple[ClauseDB, Tseitin]:
+    """断言所有公式为真，返回 (子句库, Tseitin)"""
+    tseitin = Tseitin(db)
+    for form in formulas:
+        tseitin.add(form)
+    return tseitin.db, tseitin
+
+
+if __name__ == "__main__":
+    import time
+    from formula_for_common import Formula
+    from solver import Solver
+
+    # 鸽巢原理：n+1 只鸽子放进 n 个巢，以嵌套的 | 与 & 构造，不可满足
+    n = 6
+    p = [[Formula() for j in range(n)] for i in range(n + 1)]
+    form = None
+    for i in range(n + 1):
+        some = p[i][0]
+        for j in range(1, n):
+            some = some | p[i][j]
+        form = some if form is None else form & some
+    for j in range(n):
+        for i in range(n + 1):
+            for k in range(i + 1, n + 1):
+                form = form & (~p[i][j] | ~p[k][j])
+    s = time.time()
+    db, tseitin = encode([form])
+    print(f"compiled to {db.nvars} variables, {len(db)} clauses in {1e3*(time.time()-s):.4f}ms")
+    s = time.time()
+    print("SAT" if Solver(db).solve() else "UNSAT", f"in {1e3*(time.time()-s):.4f}ms")